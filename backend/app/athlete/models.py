@@ -2,7 +2,7 @@ from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy import select
 
-from app.database import Base, async_session_maker
+from app.database import Base, session_scope
 from typing import List
 from app.user.models import User
 
@@ -12,12 +12,14 @@ class Athlete(User):
     id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
     groups = relationship("Group", secondary='group_athletes', back_populates="athletes")
 
+    __mapper_args__ = {"polymorphic_identity": "athlete"}
+
     def __str__(self) -> str:
         return f"Athlete(id={self.id}, full_name={self.full_name})"
 
     @staticmethod
     async def get_full_name(user_id: int) -> str:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             user = await session.execute(select(User.full_name).where(User.id == user_id))
             full_name = user.scalar_one_or_none()
             return full_name
@@ -0,0 +1,238 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import BigInteger, Column, DateTime, String, select
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from app.config import settings
+from app.database import Base, session_scope
+
+
+class TTLCache:
+    """
+    Ограниченный по размеру in-memory кэш с временем жизни записей.
+    При переполнении вытесняются давно не использовавшиеся записи (LRU).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class EntityVersion(Base):
+    """
+    Версии сущностей (coaches, groups, trainings, halls), общие для всех воркеров.
+    Версию увеличивают триггеры на таблицах сущности (см. ENTITY_VERSION_TRIGGER_DDL),
+    поэтому учитываются любые записи: из любого процесса, COPY и TRUNCATE.
+    """
+    __tablename__ = "entity_versions"
+
+    entity = Column(String(32), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+# Таблицы, запись в которые меняет сущность. Для users — только поля, попадающие в ответы
+# (иначе каждый логин с записью refresh_token сбрасывал бы кэш тренеров).
+ENTITY_TABLES = {
+    "coaches": ["coaches", "coach_sport_types", "sport_types", "users"],
+    "groups": ["groups", "group_athletes", "group_coaches"],
+    "trainings": ["trainings", "training_groups", "training_halls"],
+    "halls": ["halls"],
+}
+USERS_TRACKED_COLUMNS = "full_name, email, phone_number"
+
+
+def entity_version_trigger_ddl():
+    statements = [
+        # Последовательность не привязана к таблице: версии не повторяются даже после TRUNCATE ... RESTART IDENTITY
+        "CREATE SEQUENCE IF NOT EXISTS entity_versions_seq",
+        """
+        CREATE OR REPLACE FUNCTION bump_entity_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO entity_versions (entity, version, updated_at)
+            VALUES (TG_ARGV[0], nextval('entity_versions_seq'), now())
+            ON CONFLICT (entity) DO UPDATE
+            SET version = EXCLUDED.version, updated_at = EXCLUDED.updated_at;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]
+    for entity, tables in ENTITY_TABLES.items():
+        for table in tables:
+            update = f"UPDATE OF {USERS_TRACKED_COLUMNS}" if table == "users" else "UPDATE"
+            trigger = f"{table}_bump_{entity}_version"
+            statements += [
+                f"DROP TRIGGER IF EXISTS {trigger} ON {table}",
+                f"""
+                CREATE TRIGGER {trigger} AFTER INSERT OR {update} OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_entity_version('{entity}')
+                """,
+            ]
+    # Начальные версии для уже существующих данных
+    statements.append(
+        "INSERT INTO entity_versions (entity, version, updated_at) "
+        "SELECT entity, nextval('entity_versions_seq'), now() "
+        f"FROM unnest(ARRAY[{', '.join(repr(entity) for entity in ENTITY_TABLES)}]) AS entity "
+        "ON CONFLICT (entity) DO NOTHING"
+    )
+    return statements
+
+
+ENTITY_VERSION_TRIGGER_DDL = entity_version_trigger_ddl()
+
+response_cache = TTLCache(maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL)
+
+EPOCH = datetime.fromtimestamp(0, timezone.utc)
+
+# Шаг, с которым сдвигается окно «с текущего момента» в кэшируемых ответах
+NOW_WINDOW_STEP = timedelta(minutes=1)
+
+
+def window_now() -> datetime:
+    """
+    Текущий момент, округленный вниз до NOW_WINDOW_STEP. Ответы с окном от «сейчас»
+    строятся от этого значения и включают его в ключ кэша и ETag, поэтому
+    прошедшие тренировки пропадают из ответа не позже чем через один шаг,
+    даже если данные не менялись.
+    """
+    step = NOW_WINDOW_STEP.total_seconds()
+    return datetime.fromtimestamp(time.time() // step * step, timezone.utc)
+
+
+async def load_versions(entities: Sequence[str]) -> Tuple[Tuple[int, ...], datetime]:
+    """
+    Текущие версии сущностей и время последнего изменения любой из них.
+    Один запрос по первичному ключу маленькой таблицы.
+    """
+    async with session_scope() as session:
+        rows = (await session.execute(
+            select(EntityVersion.entity, EntityVersion.version, EntityVersion.updated_at)
+            .where(EntityVersion.entity.in_(entities))
+        )).all()
+    found = {row.entity: row for row in rows}
+    versions = tuple(found[entity].version if entity in found else 0 for entity in entities)
+    updated_at = max((row.updated_at for row in rows), default=EPOCH)
+    return versions, updated_at
+
+
+def make_etag(key: Hashable, versions: Tuple[int, ...]) -> str:
+    digest = hashlib.sha1(repr((key, versions)).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+async def validator_headers(key: Hashable, entities: Sequence[str]) -> Dict[str, str]:
+    """
+    Заголовки для условных запросов без кэширования тела (например, для потоковых ответов).
+    Last-Modified — время последней записи в таблицы сущностей.
+    """
+    versions, updated_at = await load_versions(entities)
+    return {
+        "ETag": make_etag(key, versions),
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc).replace(microsecond=0), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def is_not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Проверка If-None-Match (приоритетна) и If-Modified-Since по заголовкам validator_headers.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def cached_response(
+    request: Request,
+    key: Hashable,
+    entities: Sequence[str],
+    build: Callable[[], Awaitable[Any]],
+) -> Response:
+    """
+    Отдает JSON-ответ из кэша с поддержкой ETag.
+
+    - Если ETag из If-None-Match совпадает — 304 без сборки ответа и сериализации
+      (выполняется только чтение версий сущностей).
+    - Если ответ есть в кэше для текущих версий сущностей — отдаются готовые байты.
+    - Иначе вызывается build(); результат (данные или готовый Response) кэшируется.
+    """
+    versions, _ = await load_versions(entities)
+    etag = make_etag(key, versions)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    cached = response_cache.get((key, versions))
+    if cached is None:
+        result = await build()
+        if isinstance(result, Response):
+            extra_headers = {
+                name: value for name, value in result.headers.items()
+                if name not in ("content-length", "content-type")
+            }
+            cached = (result.body, extra_headers)
+        else:
+            cached = (JSONResponse(content=jsonable_encoder(result)).body, {})
+        response_cache.set((key, versions), cached)
+
+    body, extra_headers = cached
+    return Response(content=body, media_type="application/json", headers={**extra_headers, **headers})
@@ -0,0 +1,88 @@
+"""
+Формирование iCalendar (RFC 5545) по частям: заголовок, события и окончание
+выдаются отдельными строками, поэтому календарь на тысячи событий
+не собирается в памяти целиком.
+"""
+from datetime import datetime as dt, timezone
+from typing import AsyncIterator
+
+PRODID = "-//SPORT SCHOOL//Schedule//RU"
+UID_DOMAIN = "sport-school"
+# Максимальная длина строки без переноса, в октетах
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """
+    Переносит строку длиннее 75 октетов: продолжение начинается с пробела.
+    Многобайтовые символы UTF-8 не разрываются.
+    """
+    parts = []
+    current, size = "", 0
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > MAX_LINE_OCTETS:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def format_datetime(value: dt) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_header(name: str) -> str:
+    return "".join(fold_line(line) for line in (
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(name)}",
+    ))
+
+
+def calendar_footer() -> str:
+    return fold_line("END:VCALENDAR")
+
+
+def event_block(training: dict, stamp: str) -> str:
+    """
+    VEVENT для строки расписания (см. Training.schedule_query).
+    """
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:training-{training['id']}@{UID_DOMAIN}",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{format_datetime(training['start_time'])}",
+        f"DTEND:{format_datetime(training['end_time'])}",
+        f"SUMMARY:{escape_text(training['title'])}",
+        f"LOCATION:{escape_text(training['location'])}",
+        f"DESCRIPTION:{escape_text(training['description'])}",
+        "END:VEVENT",
+    ]
+    return "".join(fold_line(line) for line in lines)
+
+
+async def stream_calendar(name: str, trainings: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    stamp = format_datetime(dt.now(timezone.utc))
+    yield calendar_header(name).encode()
+    async for training in trainings:
+        yield event_block(training, stamp).encode()
+    yield calendar_footer().encode()
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.status import HTTP_403_FORBIDDEN
+
+from app.cache import validator_headers, is_not_modified
+from app.calendar.ics import stream_calendar
+from app.coach.models import Coach
+from app.database import session_scope
+from app.middleware import get_current_user
+from app.training.models import Training
+from app.user.models import User
+from app.user.schemas import UserSchema
+
+calendar_router = APIRouter(prefix="/calendar", tags=["Календарь"])
+
+# Сущности, от которых зависит содержимое фидов
+CALENDAR_ENTITIES = ("trainings", "groups", "halls", "coaches")
+# Сколько дней прошедших тренировок остается в фиде
+FEED_PAST_DAYS = 30
+# Тренировок на одну страницу чтения из БД
+FEED_PAGE_SIZE = 500
+
+
+async def calendar_owner(token: str = Query(..., description="Токен подписки на календарь")):
+    """
+    Владелец токена календаря (id, role, admin). Роли читаются из БД при каждом
+    запросе, поэтому отзыв токена и смена ролей действуют сразу.
+    """
+    owner = await User.get_by_calendar_token(token)
+    if owner is None:
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Invalid token")
+    return owner
+
+
+async def feed_trainings(filters: dict) -> AsyncIterator[dict]:
+    """
+    Читает расписание страницами по FEED_PAGE_SIZE тренировок с пагинацией по ключу
+    (start_time, id). Соединение берется из пула только на время чтения страницы
+    и возвращается до отправки данных клиенту, поэтому медленные подписчики не держат пул.
+    """
+    start_from, after = feed_window_start(), None
+    while True:
+        query = Training.schedule_query(**filters, start_from=start_from, after=after, limit=FEED_PAGE_SIZE)
+        async with session_scope(isolated=True) as session:
+            rows = (await session.execute(query)).all()
+
+        for row in rows:
+            training = Training.schedule_row_to_dict(row)
+            yield {
+                **training,
+                "start_time": row.start_time,
+                "end_time": row.end_time,
+                "description": f"Тренер: {training['coach']}. Участников: {training['participants']}",
+            }
+        if len(rows) < FEED_PAGE_SIZE:
+            return
+        after = (rows[-1].start_time, rows[-1].id)
+
+
+async def feed_response(request: Request, key: tuple, name: str, filters: dict) -> Response:
+    headers = await validator_headers(key, CALENDAR_ENTITIES)
+    if is_not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return StreamingResponse(
+        stream_calendar(name, feed_trainings(filters)),
+        media_type="text/calendar; charset=utf-8",
+        headers=headers,
+    )
+
+
+def feed_window_start() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=FEED_PAST_DAYS)
+
+
+@calendar_router.post("/token", summary="Новый токен для подписки на календарь")
+async def issue_calendar_token(request: Request, current_user: UserSchema = Depends(get_current_user)):
+    """
+    Выдает токен только для чтения фидов .ics и готовые ссылки на них.
+    Календарные приложения не умеют передавать заголовок Authorization,
+    поэтому токен передается параметром ?token=. В БД хранится только хэш токена;
+    повторный вызов выдает новый токен, а прежние ссылки перестают работать.
+    """
+    token = await User.issue_calendar_token(current_user.id)
+    feeds = {}
+    if current_user.isAthlete:
+        feeds["athlete"] = str(request.url_for("get_athlete_feed", athlete_id=current_user.id)) + f"?token={token}"
+    if current_user.isCoach:
+        feeds["coach"] = str(request.url_for("get_coach_feed", coach_id=current_user.id)) + f"?token={token}"
+    return {"token": token, "feeds": feeds}
+
+
+@calendar_router.delete("/token", summary="Отозвать токен подписки на календарь")
+async def revoke_calendar_token(current_user: UserSchema = Depends(get_current_user)):
+    await User.revoke_calendar_token(current_user.id)
+    return {"message": "Подписка на календарь отключена"}
+
+
+@calendar_router.get("/athletes/{athlete_id}.ics", summary="Календарь тренировок атлета")
+async def get_athlete_feed(athlete_id: int, request: Request, owner=Depends(calendar_owner)):
+    """
+    Тренировки всех групп атлета. Доступен самому атлету, тренерам его групп и администраторам.
+    """
+    allowed = (
+        owner.id == athlete_id
+        or owner.admin
+        or (owner.role == "coach" and await Coach.coaches_athlete(owner.id, athlete_id))
+    )
+    if not allowed:
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Недостаточно прав")
+
+    return await feed_response(request, ("calendar", "athlete", athlete_id), "Мои тренировки", {"athlete_id": athlete_id})
+
+
+@calendar_router.get("/coaches/{coach_id}.ics", summary="Календарь тренировок тренера")
+async def get_coach_feed(coach_id: int, request: Request, owner=Depends(calendar_owner)):
+    """
+    Тренировки всех групп тренера (те же данные, что Coach.get_upcoming_trainings).
+    """
+    return await feed_response(request, ("calendar", "coach", coach_id), "Тренировки тренера", {"coach_id": coach_id})
+
+
+@calendar_router.get("/halls/{hall_id}.ics", summary="Календарь занятости зала")
+async def get_hall_feed(hall_id: int, request: Request, owner=Depends(calendar_owner)):
+    return await feed_response(request, ("calendar", "hall", hall_id), "Занятость зала", {"hall_id": hall_id})
@@ -6,12 +6,14 @@ from typing import List, Dict, Optional
 from app.specialization.models import SportType
 from app.specialization.coach_sport_type import CoachSportType # Импортируем CoachSportType
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
-from sqlalchemy import exists
+from app.database import session_scope
+from sqlalchemy import exists, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from datetime import datetime as dt
 from app.coach.schemas import CoachSchema
 from app.user.models import User
 from app.group.models import Group, group_coaches
+from app.pagination import keyset_by_id
 
 class Coach(User):
     __tablename__ = "coaches"
@@ -23,16 +25,23 @@ class Coach(User):
     coach_sport_types = relationship("CoachSportType", back_populates="coach")
     groups = relationship("Group", secondary='group_coaches', back_populates="coaches")
 
+    __mapper_args__ = {"polymorphic_identity": "coach"}
+
     def __str__(self, coach_id: int) -> str:
         return f"Coach ID: {coach_id}"
 
+    @staticmethod
+    async def get_coach(coach_id: int) -> Optional["Coach"]:
+        async with session_scope() as session:
+            return await session.get(Coach, coach_id)
+
     @staticmethod
     async def get_coach_id(group_id: int) -> Optional[int]:
         """
         Возвращает ID тренера, связанного с указанной группой.
         Предполагаем, что у группы один основной тренер.
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             query = (
                 select(Coach.id)
                 .join(group_coaches)
@@ -43,75 +52,95 @@ class Coach(User):
             return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_coaches() -> List[CoachSchema]:
-        async with async_session_maker() as session:
-            result = await session.execute(select(Coach))
-            coaches = result.scalars().all()
-            coach_schemas = []
-            for coach in coaches:
-                coach_id = coach.id
-                contact_info = await Coach.get_contact_info(coach_id)
-                specializations = await SportType.get_specializations(coach_id)
-                coach_schema = CoachSchema(
-                    id=coach_id,
-                    experience_years=await Coach.get_experience_years(coach_id),
-                    bio=await Coach.get_bio(coach_id),
-                    full_name=await Coach.get_full_name(coach_id),
-                    email=contact_info.get("email"),
-                    specialization=specializations
-                )
-                coach_schemas.append(coach_schema)
-            return coach_schemas
+    def directory_query(
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        """
+        Строит запрос справочника тренеров: данные пользователя, тренера и
+        массив специализаций собираются одним запросом с агрегацией.
+        Пагинация — по ключу (id > after_id), без OFFSET.
+        Если специализации не запрошены (fields), агрегация не выполняется.
+        """
+        columns = [
+            column for column in (Coach.id, Coach.experience_years, Coach.bio, Coach.full_name, Coach.email)
+            if fields is None or column.key in fields
+        ]
+        query = select(*columns)
+
+        if fields is None or "specialization" in fields:
+            specializations = func.array_remove(
+                func.array_agg(aggregate_order_by(SportType.name, SportType.name)), None
+            )
+            query = (
+                query.add_columns(specializations.label("specialization"))
+                .outerjoin(CoachSportType, CoachSportType.coach_id == Coach.id)
+                .outerjoin(SportType, SportType.id == CoachSportType.sport_type_id)
+                .group_by(*columns)
+            )
+
+        return keyset_by_id(query, Coach.id, after_id, limit)
+
+    @staticmethod
+    async def get_coaches(
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """
+        Возвращает страницу справочника тренеров, собранную одним запросом.
+        """
+        async with session_scope() as session:
+            result = await session.execute(Coach.directory_query(after_id=after_id, limit=limit, fields=fields))
+            return [dict(row._mapping) for row in result.all()]
 
     @staticmethod
     async def get_full_name(coach_id: int) -> str:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             coach = await session.execute(select(User.full_name).join(Coach).where(Coach.id == coach_id))
             coach = coach.scalar_one_or_none()
             return coach
 
     @staticmethod
     async def get_experience_years(coach_id: int) -> int:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             coach = await session.execute(select(Coach.experience_years).where(Coach.id == coach_id))
             coach = coach.scalar_one_or_none()
             return coach
 
     @staticmethod
     async def get_bio(coach_id: int) -> str:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             coach = await session.execute(select(Coach.bio).where(Coach.id == coach_id))
             coach = coach.scalar_one_or_none()
             return coach
 
     @staticmethod
-    async def get_upcoming_trainings(coach_id: int) -> List[dict]:
+    async def coaches_athlete(coach_id: int, athlete_id: int) -> bool:
         """
-        Собирает расписание тренера и добавляет его имя в каждую тренировку.
+        Проверяет, тренирует ли тренер хотя бы одну группу атлета.
+        """
+        from app.group.models import group_athletes
+
+        async with session_scope() as session:
+            result = await session.execute(select(exists(
+                select(group_coaches.c.group_id)
+                .join(group_athletes, group_athletes.c.group_id == group_coaches.c.group_id)
+                .where(group_coaches.c.coach_id == coach_id, group_athletes.c.athlete_id == athlete_id)
+            )))
+            return result.scalar()
+
+    @staticmethod
+    async def get_upcoming_trainings(coach_id: int, start_from: Optional[dt] = None) -> List[dict]:
+        """
+        Собирает расписание тренера по всем его группам одним запросом.
+        Имя тренера подставляется в каждую тренировку на стороне БД.
+        Без start_from — тренировки, начинающиеся с текущего момента.
         """
-        from app.group.models import Group
         from app.training.models import Training
 
-        # 1. Сначала получаем имя тренера, от которого будет идти запрос
-        coach_name = await Coach.get_full_name(coach_id)
-
-        all_trainings = []
-        # 2. Получаем все группы, которые ведет тренер
-        groups = await Group.get_groups_coach(coach_id)
-
-        # 3. Для каждой группы получаем ее "сырое" расписание
-        for group in groups:
-            group_trainings = await Training.get_upcoming(group.id)
-            all_trainings.extend(group_trainings)
-        
-        # 4. Теперь, когда у нас есть полный список, обогащаем его именем тренера
-        for training in all_trainings:
-            training["coach"] = coach_name or "Тренер не назначен"
-        
-        # 5. Сортируем итоговое расписание по дате и времени
-        all_trainings.sort(key=lambda x: (x['date'], x['time']))
-        
-        return all_trainings
+        return await Training.load_schedule(coach_id=coach_id, start_from=start_from)
 
     @staticmethod
     async def get_contact_info(coach_id: int) -> Optional[Dict[str, str]]:
@@ -119,7 +148,7 @@ class Coach(User):
         Получает контактную информацию тренера (телефон и email) по его ID.
         Метод самостоятельно управляет сессией.
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             result = await session.execute(
                 select(Coach.phone_number, Coach.email).where(Coach.id == coach_id)
             )
@@ -130,34 +159,3 @@ class Coach(User):
     @staticmethod
     def create_coach(user_id: int) -> bool:
             pass
-
-    @staticmethod
-    async def is_available(coach_id: int, start_time: dt, end_time: dt) -> bool:
-        """
-        Проверяет, свободен ли тренер в указанный временной интервал.
-        Возвращает True, если свободен, и False, если есть пересечение.
-        """
-        # Локальные импорты
-        from app.training.models import Training
-        from app.group.models import training_groups, group_coaches
-
-        async with async_session_maker() as session:
-            # Запрос для поиска пересекающихся тренировок у данного тренера
-            # Цепочка JOIN: Training -> training_groups -> group_coaches
-            overlap_query = select(Training.id).join(
-                Training.groups # Явно указываем, что джойним к модели Group через связь groups
-            ).join(
-                Group.coaches   # Затем от Group джойним к модели Coach через связь coaches
-            ).where(
-                Coach.id == coach_id, # Фильтруем по ID нужного нам тренера
-                Training.start_time < end_time,
-                Training.end_time > start_time
-            )
-
-            # Проверяем, существует ли хотя бы одна такая запись
-            overlapping_training_exists = await session.execute(
-                select(exists(overlap_query))
-            )
-            
-            # Возвращаем True, если НЕТ пересечений
-            return not overlapping_training_exists.scalar()
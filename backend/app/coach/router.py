@@ -1,30 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List, Dict
 from app.coach.schemas import CoachSchema, CoachResponseSchema
 from app.coach.models import Coach
 from sqlalchemy import select
 from app.middleware import get_current_user
 from app.user.schemas import UserSchema
+from app.pagination import PageParams, page_response
+from app.cache import cached_response, window_now
 from app.specialization.models import SportType
-from app.database import async_session_maker
+from app.database import fan_out
 from sqlalchemy.ext.asyncio import AsyncSession
 
 coach_router = APIRouter(prefix="/coaches", tags=["ТРЕНЕР"])
 
+# Сущности, от которых зависят ответы: их запись сбрасывает кэш
+COACH_DIRECTORY_ENTITIES = ("coaches",)
+COACH_PROFILE_ENTITIES = ("coaches", "groups", "trainings", "halls")
+
 @coach_router.get("/", response_model=List[CoachSchema], summary="Получение списка тренеров")
-async def get_coaches(current_user: UserSchema = Depends(get_current_user)) -> List[CoachSchema]:
-    return await Coach.get_coaches()
+async def get_coaches(
+    request: Request,
+    page: PageParams = Depends(),
+    current_user: UserSchema = Depends(get_current_user),
+):
+    async def build():
+        coaches = await Coach.get_coaches(
+            after_id=page.after_id, limit=page.fetch_limit, fields=page.selected_fields(CoachSchema)
+        )
+        return page_response(coaches, CoachSchema, page)
+
+    key = ("coaches", page.cursor, page.limit, tuple(page.fields or ()))
+    return await cached_response(request, key, COACH_DIRECTORY_ENTITIES, build)
 
 @coach_router.get("/{id}", response_model=CoachResponseSchema, summary="Получение данных тренера по ID")
-async def get_coach(id: int, current_user: UserSchema = Depends(get_current_user)):
-    async with async_session_maker() as session:
-        coach = await session.get(Coach, id)
+async def get_coach(id: int, request: Request, current_user: UserSchema = Depends(get_current_user)):
+    # Предстоящие тренировки считаются от window_now(): момент входит в ключ кэша и ETag
+    start_from = window_now()
+
+    async def build():
+        # Источники независимы: запрашиваем параллельно, каждый на своем соединении
+        coach, contact_info, specializations, schedule = await fan_out(
+            Coach.get_coach(id),
+            Coach.get_contact_info(id),
+            SportType.get_specializations(id),
+            Coach.get_upcoming_trainings(id, start_from),
+        )
         if not coach:
             raise HTTPException(status_code=404, detail="Тренер не найден")
 
-        contact_info = await Coach.get_contact_info(coach.id)
-        specializations = await SportType.get_specializations(coach.id)
-
         coach_data = CoachSchema(
             id=coach.id,
             experience_years=coach.experience_years,
@@ -34,6 +57,6 @@ async def get_coach(id: int, current_user: UserSchema = Depends(get_current_user
             specialization=specializations
         )
 
-        schedule = await Coach.get_upcoming_trainings(coach.id)
-
         return CoachResponseSchema(trainer=coach_data, schedule=schedule)
+
+    return await cached_response(request, ("coach", id, start_from), COACH_PROFILE_ENTITIES, build)
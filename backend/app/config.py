@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import computed_field
+from zoneinfo import ZoneInfo
 
 class Settings(BaseSettings):
     DB_HOST: str
@@ -9,6 +10,50 @@ class Settings(BaseSettings):
     DB_NAME: str
     DEBUG: bool
 
+    # Пул соединений с БД (на один воркер)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Размер кэша подготовленных выражений asyncpg на соединение (0 — отключить, нужно для pgbouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # Таймаут проверки БД в /health/ready, секунды
+    HEALTH_DB_TIMEOUT: float = 2.0
+
+    # Кэш принципалов (данных текущего пользователя) для токенов без claims
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 300
+
+    # Пул потоков для хэширования паролей (argon2)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    PASSWORD_HASH_RETRY_AFTER: int = 1
+
+    # Кэш ответов для справочника тренеров и расписаний
+    RESPONSE_CACHE_SIZE: int = 1000
+    RESPONSE_CACHE_TTL: int = 30
+
+    # Часы работы залов (в часовом поясе школы): свободные слоты, сетка расписания, отчет о загрузке
+    HALL_OPEN_HOUR: int = 8
+    HALL_CLOSE_HOUR: int = 22
+    # Часовой пояс школы (имя из базы IANA)
+    SCHOOL_TIMEZONE: str = "Europe/Moscow"
+
+    # Запросы дольше этого порога (мс) пишутся в лог вместе с числом SQL-запросов
+    SLOW_REQUEST_MS: int = 500
+    # Сколько параллельных запросов к БД (отдельных соединений пула) может открыть один HTTP-запрос.
+    # Сессия запроса на время fan_out закрывается, поэтому это и есть весь бюджет запроса:
+    # при пуле 5 + 10 соединений одновременно «в ширину» идут до трех таких запросов
+    REQUEST_FANOUT_LIMIT: int = 4
+
+    # Профилирование отдельных запросов (только при DEBUG): каталог для .prof-файлов
+    PROFILE_DIR: str = "profiles"
+
+    @property
+    def school_tz(self) -> ZoneInfo:
+        return ZoneInfo(self.SCHOOL_TIMEZONE)
+
     @computed_field
     @property
     def DATABASE_URL(self) -> str:
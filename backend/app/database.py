@@ -1,15 +1,179 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, List, Optional
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from app.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
 
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
 
-async def create_db_and_tables(app):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+class RequestScope:
+    """
+    Состояние БД в рамках одного HTTP-запроса: общая сессия (создается лениво
+    при первом обращении), счетчик выдачи соединений из пула,
+    количество SQL-запросов и суммарное время их выполнения.
+    """
+
+    def __init__(self):
+        self.session: Optional[AsyncSession] = None
+        self.checkouts = 0
+        self.queries = 0
+        self.db_time = 0.0
+
+    def get_session(self) -> AsyncSession:
+        if self.session is None:
+            self.session = async_session_maker()
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class PoolStats:
+    """
+    Телеметрия пула соединений: текущее состояние пула и время ожидания
+    соединения (от запроса до выдачи, включая установку нового соединения).
+    """
+
+    def __init__(self):
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        pool = engine.sync_engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "waits": self.waits,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+pool_stats = PoolStats()
+
+
+async def acquire_connection(session: AsyncSession) -> None:
+    """
+    Заранее берет соединение для сессии и замеряет время ожидания пула.
+    """
+    if session.in_transaction():
+        return
+    started = time.perf_counter()
+    await session.connection()
+    pool_stats.record_wait(time.perf_counter() - started)
+
+
+request_scope: ContextVar[Optional[RequestScope]] = ContextVar("request_scope", default=None)
+# True внутри задач fan_out: session_scope() открывает отдельную сессию
+isolated_sessions: ContextVar[bool] = ContextVar("isolated_sessions", default=False)
+
+
+@asynccontextmanager
+async def session_scope(isolated: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Возвращает сессию текущего запроса, чтобы все методы моделей работали
+    через одно соединение и одну транзакцию. Вне запроса (фоновые задачи, CLI)
+    или при isolated=True открывается отдельная сессия.
+
+    isolated=True нужен для параллельных запросов внутри одного HTTP-запроса:
+    одну AsyncSession нельзя использовать из нескольких задач одновременно.
+    Внутри fan_out отдельная сессия открывается автоматически.
+    """
+    scope = request_scope.get()
+    if scope is None or isolated or isolated_sessions.get():
+        async with async_session_maker() as session:
+            await acquire_connection(session)
+            yield session
+    else:
+        session = scope.get_session()
+        await acquire_connection(session)
+        yield session
+
+
+async def release_request_session() -> None:
+    """
+    Закрывает сессию текущего запроса и возвращает ее соединение в пул.
+    Вызывается перед долгой работой без БД (например, хэширование пароля),
+    чтобы запрос не держал соединение и открытую транзакцию; следующий
+    session_scope() откроет новую сессию. Незафиксированные изменения откатываются.
+    """
+    scope = request_scope.get()
+    if scope is not None:
+        await scope.close()
+
+
+async def fan_out(*aws: Awaitable[Any], limit: Optional[int] = None) -> List[Any]:
+    """
+    Выполняет независимые методы моделей параллельно (asyncio.gather),
+    каждый — в своей сессии на отдельном соединении из пула.
+    Одновременно выполняется не больше limit задач (по умолчанию REQUEST_FANOUT_LIMIT),
+    чтобы один запрос не занимал весь пул.
+
+    Сессия текущего запроса перед запуском закрывается (release_request_session),
+    чтобы ее соединение не простаивало рядом с параллельными: запрос держит не больше
+    limit соединений. Поэтому вызывать fan_out можно только после фиксации записей.
+    """
+    semaphore = asyncio.Semaphore(limit or settings.REQUEST_FANOUT_LIMIT)
+    await release_request_session()
+
+    async def run_isolated(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            # Флаг выставляется в контексте задачи и не влияет на остальной запрос
+            isolated_sessions.set(True)
+            return await aw
+
+    return list(await asyncio.gather(*(run_isolated(aw) for aw in aws)))
+
+
+@event.listens_for(engine.sync_engine, "checkout")
+def count_checkout(dbapi_connection, connection_record, connection_proxy):
+    scope = request_scope.get()
+    if scope is not None:
+        scope.checkouts += 1
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    scope = request_scope.get()
+    if scope is not None:
+        scope.queries += 1
+        scope.db_time += time.perf_counter() - started
 
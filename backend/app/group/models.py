@@ -1,15 +1,18 @@
-from sqlalchemy import Column, Integer, String, Identity, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Identity, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy import select
-from app.database import Base, async_session_maker
-from typing import List
+from sqlalchemy import select, func, update, text
+from app.database import Base, session_scope
+from typing import List, Optional
 from app.athlete.models import Athlete
+from app.pagination import keyset_by_id
 
 group_athletes = Table(
     "group_athletes",
     Base.metadata,
     Column("group_id", ForeignKey("groups.id"), primary_key=True),
     Column("athlete_id", ForeignKey("athletes.id"), primary_key=True),
+    # PK (group_id, athlete_id) не помогает при поиске групп атлета
+    Index("ix_group_athletes_athlete_id", "athlete_id"),
 )
 
 group_coaches = Table(
@@ -17,6 +20,8 @@ group_coaches = Table(
     Base.metadata,
     Column("group_id", ForeignKey("groups.id"), primary_key=True),
     Column("coach_id", ForeignKey("coaches.id"), primary_key=True),
+    # PK (group_id, coach_id) не помогает при поиске групп тренера
+    Index("ix_group_coaches_coach_id", "coach_id"),
 )
 
 training_groups = Table(
@@ -24,13 +29,58 @@ training_groups = Table(
     Base.metadata,
     Column("training_id", ForeignKey("trainings.id"), primary_key=True),
     Column("group_id", ForeignKey("groups.id"), primary_key=True),
+    # PK (training_id, group_id) не помогает при поиске тренировок группы
+    Index("ix_training_groups_group_id", "group_id"),
 )
 
+# Триггер поддерживает groups.member_count при любых изменениях group_athletes.
+# Триггеры уровня выражения с таблицами переходов: одна UPDATE на выражение,
+# поэтому массовые вставки (COPY, executemany) не обновляют группу построчно.
+MEMBER_COUNT_TRIGGER_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION group_athletes_member_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE groups SET member_count = groups.member_count - changes.delta
+            FROM (SELECT group_id, count(*) AS delta FROM old_rows GROUP BY group_id) AS changes
+            WHERE groups.id = changes.group_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE groups SET member_count = groups.member_count + changes.delta
+            FROM (SELECT group_id, count(*) AS delta FROM new_rows GROUP BY group_id) AS changes
+            WHERE groups.id = changes.group_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS group_athletes_member_count_insert ON group_athletes",
+    "DROP TRIGGER IF EXISTS group_athletes_member_count_update ON group_athletes",
+    "DROP TRIGGER IF EXISTS group_athletes_member_count_delete ON group_athletes",
+    """
+    CREATE TRIGGER group_athletes_member_count_insert AFTER INSERT ON group_athletes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION group_athletes_member_count()
+    """,
+    """
+    CREATE TRIGGER group_athletes_member_count_update AFTER UPDATE ON group_athletes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION group_athletes_member_count()
+    """,
+    """
+    CREATE TRIGGER group_athletes_member_count_delete AFTER DELETE ON group_athletes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION group_athletes_member_count()
+    """,
+]
+
 class Group(Base):
     __tablename__ = "groups"
 
     id = Column(Integer, Identity(), primary_key=True)
     name = Column(String, nullable=False)
+    # Число участников; поддерживается триггером (см. MEMBER_COUNT_TRIGGER_DDL)
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     athletes = relationship("Athlete", secondary=group_athletes, back_populates="groups")
     coaches = relationship("Coach", secondary=group_coaches, back_populates="groups")
@@ -40,15 +90,20 @@ class Group(Base):
             return f"Group '{self.name}' (id={self.id})"
     
     @staticmethod
-    async def get_all_groups() -> List['Group']:
+    async def get_all_groups(
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
         """
-        Статический метод для получения всех групп.
+        Статический метод для получения страницы групп.
+        Выбираются только запрошенные колонки (fields), пагинация — по id.
         """
-        async with async_session_maker() as session:
-            query = select(Group)
+        columns = [column for column in Group.__table__.c if fields is None or column.name in fields]
+        async with session_scope() as session:
+            query = keyset_by_id(select(*columns), Group.id, after_id, limit)
             result = await session.execute(query)
-            groups = result.scalars().all()
-            return list(groups)
+            return [dict(row._mapping) for row in result.all()]
 
     @staticmethod
     async def get_groups_coach(coach_id: int) -> List['Group']:
@@ -56,7 +111,7 @@ class Group(Base):
         Статический метод для получения групп по ID тренера.
         Запрос исправлен для работы со связью "многие-ко-многим".
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             query = select(Group).join(group_coaches).where(group_coaches.c.coach_id == coach_id)
             result = await session.execute(query)
             groups = result.scalars().all()
@@ -67,7 +122,7 @@ class Group(Base):
         """
         Статический метод для получения участников группы по ID группы.
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             query = select(Athlete).join(group_athletes).where(group_athletes.c.group_id == group_id)
             result = await session.execute(query)
             athletes = result.scalars().all()
@@ -77,36 +132,45 @@ class Group(Base):
     async def get_schedule(athlete_id: int) -> List[dict]:
         """
         Главный метод-оркестратор для получения расписания атлета.
-        Реализован в соответствии с диаграммой последовательности.
+        Всё расписание по всем группам атлета собирается одним запросом.
         """
         from app.training.models import Training
-        from app.coach.models import Coach
 
-        all_trainings = []
+        return await Training.load_schedule(athlete_id=athlete_id)
+
+    @staticmethod
+    async def get_member_count(group_id: int) -> int:
+        async with session_scope() as session:
+            result = await session.execute(select(Group.member_count).where(Group.id == group_id))
+            return result.scalar_one_or_none() or 0
 
-        # 1. Находим все группы, в которых состоит атлет
-        async with async_session_maker() as session:
-            groups_query = select(Group).join(group_athletes).where(group_athletes.c.athlete_id == athlete_id)
-            groups_result = await session.execute(groups_query)
-            groups = groups_result.scalars().all()
+    @staticmethod
+    async def reconcile_member_counts() -> List[int]:
+        """
+        Пересчитывает member_count по group_athletes и исправляет расхождения
+        (например, после ручных правок при отключенных триггерах).
+        Возвращает ID исправленных групп.
 
-        # 2. Для каждой группы собираем полное расписание
-        for group in groups:
-            # 2.1 Получаем "сырое" расписание (без имени тренера)
-            group_trainings = await Training.get_upcoming(group.id)
+        group_athletes блокируется в режиме SHARE до конца транзакции: параллельные
+        записи (и их триггеры) ждут сверки, поэтому пересчет по снимку не затирает
+        их изменения. Запускается из одного места — python -m app.migrate или
+        python -m app.reconcile по расписанию, а не в каждом воркере.
+        """
+        actual = (
+            select(func.count())
+            .select_from(group_athletes)
+            .where(group_athletes.c.group_id == Group.id)
+            .scalar_subquery()
+        )
+        async with session_scope() as session:
+            await session.execute(text("LOCK TABLE group_athletes IN SHARE MODE"))
+            result = await session.execute(
+                update(Group)
+                .where(Group.member_count.is_distinct_from(actual))
+                .values(member_count=actual)
+                .returning(Group.id)
+            )
+            group_ids = list(result.scalars().all())
+            await session.commit()
+            return group_ids
 
-            # 2.2 Получаем ID тренера и его имя
-            coach_id = await Coach.get_coach_id(group.id)
-            coach_name = "Тренер не назначен"
-            if coach_id:
-                coach_name = await Coach.get_full_name(coach_id)
-            
-            # 2.3 Обогащаем каждую тренировку именем тренера
-            for training in group_trainings:
-                training["coach"] = coach_name
-            
-            all_trainings.extend(group_trainings)
-        
-        # 3. Сортируем итоговое расписание и возвращаем
-        all_trainings.sort(key=lambda x: (x['date'], x['time']))
-        return all_trainings
\ No newline at end of file
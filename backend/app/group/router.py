@@ -4,12 +4,20 @@ from app.group.schemas import GroupSchema
 from app.group.models import Group
 from app.middleware import get_current_user
 from app.user.schemas import UserSchema
+from app.pagination import PageParams, page_response
 
 group_router = APIRouter(prefix="/groups", tags=["Группы"])
 
 @group_router.get("/", response_model=List[GroupSchema], summary="Получение списка всех групп")
-async def get_groups(current_user: UserSchema = Depends(get_current_user)):
+async def get_groups(
+    page: PageParams = Depends(),
+    current_user: UserSchema = Depends(get_current_user),
+):
     """
-    Возвращает список всех тренировочных групп.
+    Возвращает страницу тренировочных групп.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
     """
-    return await Group.get_all_groups()
\ No newline at end of file
+    groups = await Group.get_all_groups(
+        after_id=page.after_id, limit=page.fetch_limit, fields=page.selected_fields(GroupSchema)
+    )
+    return page_response(groups, GroupSchema, page)
\ No newline at end of file
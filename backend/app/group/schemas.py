@@ -3,6 +3,7 @@ from pydantic import BaseModel
 class GroupSchema(BaseModel):
     id: int
     name: str
+    member_count: int = 0
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,11 +1,122 @@
-from sqlalchemy import Column, Integer, String, Identity, select, exists
+from sqlalchemy import Column, Integer, String, Identity, DateTime, ForeignKey, Index, select, exists, func, extract, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from app.database import Base, async_session_maker
+from app.database import Base, session_scope
+from app.pagination import keyset_by_id
 from app.training_hall.models import TrainingHall
+from typing import List, Optional
 # ДОБАВЬТЕ ЭТИ ИМПОРТЫ
-from datetime import datetime as dt
+from datetime import datetime as dt, date, time, timedelta, timezone
+
+
+# Занятость залов по часам (таблица hall_usage) поддерживается триггерами на training_halls:
+# каждая запись прибавляет (новые строки) или вычитает (старые строки) свои минуты
+# в затронутых корзинах (зал, час). Приращения коммутативны, поэтому параллельные
+# транзакции не перезаписывают вклад друг друга и не конфликтуют по первичному ключу.
+HALL_USAGE_TRIGGER_DDL = [
+    # Часовые корзины (UTC), которые пересекает интервал занятости
+    """
+    CREATE OR REPLACE FUNCTION hall_usage_buckets(during tstzrange) RETURNS SETOF timestamptz AS $$
+        SELECT generate_series(
+            date_trunc('hour', lower(during), 'UTC'),
+            upper(during) - interval '1 microsecond',
+            interval '1 hour'
+        )
+    $$ LANGUAGE sql STABLE
+    """,
+    # Приращение корзин: интервал ranges[i] зала halls[i] входит в агрегат со знаком signs[i].
+    # Корзины вставляются в порядке ключа, чтобы параллельные транзакции не взаимоблокировались;
+    # обнулившиеся корзины удаляются.
+    """
+    CREATE OR REPLACE FUNCTION hall_usage_apply(halls integer[], ranges tstzrange[], signs integer[]) RETURNS void AS $$
+        INSERT INTO hall_usage AS usage (hall_id, bucket, minutes)
+        SELECT delta.hall_id, delta.bucket, delta.minutes
+        FROM (
+            SELECT r.hall_id, b.bucket, sum(r.sign * round(
+                extract(epoch FROM
+                    upper(r.during * tstzrange(b.bucket, b.bucket + interval '1 hour'))
+                    - lower(r.during * tstzrange(b.bucket, b.bucket + interval '1 hour'))
+                ) / 60
+            ))::integer AS minutes
+            FROM unnest(halls, ranges, signs) AS r(hall_id, during, sign), hall_usage_buckets(r.during) AS b(bucket)
+            GROUP BY r.hall_id, b.bucket
+        ) AS delta
+        WHERE delta.minutes <> 0
+        ORDER BY delta.hall_id, delta.bucket
+        ON CONFLICT (hall_id, bucket) DO UPDATE SET minutes = usage.minutes + EXCLUDED.minutes;
+
+        DELETE FROM hall_usage
+        USING unnest(halls, ranges) AS r(hall_id, during), hall_usage_buckets(r.during) AS b(bucket)
+        WHERE hall_usage.hall_id = r.hall_id AND hall_usage.bucket = b.bucket AND hall_usage.minutes <= 0;
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION training_halls_hall_usage() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' THEN
+            PERFORM hall_usage_apply(array_agg(hall_id), array_agg(during), array_agg(sign))
+            FROM (
+                SELECT hall_id, during, -1 AS sign FROM old_rows
+                UNION ALL
+                SELECT hall_id, during, 1 AS sign FROM new_rows
+            ) AS changed;
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM hall_usage_apply(array_agg(hall_id), array_agg(during), array_agg(-1)) FROM old_rows;
+        ELSE
+            PERFORM hall_usage_apply(array_agg(hall_id), array_agg(during), array_agg(1)) FROM new_rows;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS training_halls_hall_usage_insert ON training_halls",
+    "DROP TRIGGER IF EXISTS training_halls_hall_usage_update ON training_halls",
+    "DROP TRIGGER IF EXISTS training_halls_hall_usage_delete ON training_halls",
+    """
+    CREATE TRIGGER training_halls_hall_usage_insert AFTER INSERT ON training_halls
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION training_halls_hall_usage()
+    """,
+    """
+    CREATE TRIGGER training_halls_hall_usage_update AFTER UPDATE ON training_halls
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION training_halls_hall_usage()
+    """,
+    """
+    CREATE TRIGGER training_halls_hall_usage_delete AFTER DELETE ON training_halls
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION training_halls_hall_usage()
+    """,
+    # Пересчет через DELETE + INSERT гонялся по первичному ключу (23505), заменен на hall_usage_apply
+    "DROP FUNCTION IF EXISTS hall_usage_refresh(integer[], timestamptz[])",
+]
+
+# Полный пересчет hall_usage — для данных, записанных до установки триггеров.
+# TRUNCATE блокирует hall_usage, поэтому триггеры параллельных записей дождутся пересчета.
+HALL_USAGE_REBUILD = [
+    "TRUNCATE hall_usage",
+    """
+    SELECT hall_usage_apply(array_agg(hall_id), array_agg(during), array_agg(1))
+    FROM training_halls
+    """,
+]
+
+
+class HallUsage(Base):
+    """
+    Агрегат занятости: сколько минут зал занят в каждом часе (UTC).
+    Строки есть только для часов, в которых была хотя бы одна тренировка.
+    """
+    __tablename__ = "hall_usage"
+    __table_args__ = (
+        # Отчет по всем залам за окно недель
+        Index("ix_hall_usage_bucket", "bucket"),
+    )
+
+    hall_id = Column(Integer, ForeignKey("halls.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    minutes = Column(Integer, nullable=False)
 
 
 class Hall(Base):
@@ -20,6 +131,22 @@ class Hall(Base):
     def __repr__(self):
         return f"<Hall(id={self.id}, name='{self.name}', capacity={self.capacity})>"
 
+    @staticmethod
+    async def get_halls(
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """
+        Возвращает страницу залов.
+        Выбираются только запрошенные колонки (fields), пагинация — по id.
+        """
+        columns = [column for column in Hall.__table__.c if fields is None or column.name in fields]
+        async with session_scope() as session:
+            query = keyset_by_id(select(*columns), Hall.id, after_id, limit)
+            result = await session.execute(query)
+            return [dict(row._mapping) for row in result.all()]
+
     @staticmethod
     async def get_hall(training_id: int) -> str:
         """
@@ -31,7 +158,7 @@ class Hall(Base):
         Returns:
             Название зала или "Неизвестно", если зал не найден.
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             query = select(Hall.name).join(
                 TrainingHall
             ).where(
@@ -42,31 +169,115 @@ class Hall(Base):
             return hall_name if hall_name else "Неизвестно"
 
     @staticmethod
-    async def is_available(hall_id: int, start_time: dt, end_time: dt) -> bool:
+    def capacity_audit_query(after_id: Optional[int] = None, limit: Optional[int] = None):
         """
-        Проверяет, свободен ли зал в указанный временной интервал.
-        Возвращает True, если свободен, и False, если есть пересечение.
+        Один агрегирующий запрос: тренировки, участников которых (сумма
+        groups.member_count по всем группам тренировки) больше вместимости зала.
+        Пагинация — по id тренировки.
         """
-        # Локальные импорты, чтобы избежать циклических зависимостей
+        from app.group.models import Group, training_groups
         from app.training.models import Training
-        from app.training_hall.models import TrainingHall
-        
-        async with async_session_maker() as session:
-            # Логика проверки пересечения интервалов:
-            # (StartA < EndB) and (EndA > StartB)
-            # Нам нужно найти хотя бы ОДНУ тренировку, которая пересекается.
-            # EXISTS() в SQL - самый эффективный способ для этого.
-            overlap_query = select(Training.id).join(TrainingHall).where(
-                TrainingHall.hall_id == hall_id,
-                Training.start_time < end_time,
-                Training.end_time > start_time
-            )
-            
-            # Мы проверяем, существует ли хотя бы одна такая запись
-            overlapping_training_exists = await session.execute(
-                select(exists(overlap_query))
+
+        participants = func.sum(Group.member_count)
+        query = (
+            select(
+                Training.id,
+                Training.start_time,
+                Training.end_time,
+                Hall.id.label("hall_id"),
+                Hall.name.label("hall_name"),
+                Hall.capacity,
+                participants.label("participants"),
             )
-            
-            # Если пересекающаяся тренировка существует, scalar() вернет True.
-            # Нам нужно вернуть обратное значение: зал НЕ доступен, если что-то найдено.
-            return not overlapping_training_exists.scalar()
\ No newline at end of file
+            .join(TrainingHall, TrainingHall.training_id == Training.id)
+            .join(Hall, Hall.id == TrainingHall.hall_id)
+            .join(training_groups, training_groups.c.training_id == Training.id)
+            .join(Group, Group.id == training_groups.c.group_id)
+            .group_by(Training.id, Hall.id)
+            .having(participants > Hall.capacity)
+        )
+        return keyset_by_id(query, Training.id, after_id, limit)
+
+    @staticmethod
+    async def get_capacity_violations(after_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        async with session_scope() as session:
+            result = await session.execute(Hall.capacity_audit_query(after_id, limit))
+            return [dict(row._mapping) for row in result.all()]
+
+
+    @staticmethod
+    def utilization_query(
+        window_start: dt, window_end: dt, open_hour: int, close_hour: int, tz_name: str, hall_id: Optional[int] = None
+    ):
+        """
+        Занятые минуты по (зал, день недели, час) за окно — один агрегирующий
+        запрос по hall_usage в часах работы залов. День недели ISO: 1 — понедельник;
+        день и час берутся в поясе tz_name (корзины hall_usage — целые часы UTC,
+        поэтому пояс должен иметь смещение в целых часах).
+        """
+        bucket = func.timezone(tz_name, HallUsage.bucket)
+        weekday = extract("isodow", bucket).label("weekday")
+        hour = extract("hour", bucket).label("hour")
+        query = (
+            select(HallUsage.hall_id, weekday, hour, func.sum(HallUsage.minutes).label("minutes"))
+            .where(HallUsage.bucket >= window_start, HallUsage.bucket < window_end)
+            .where(hour >= open_hour, hour < close_hour)
+            .group_by(HallUsage.hall_id, weekday, hour)
+        )
+        if hall_id is not None:
+            query = query.where(HallUsage.hall_id == hall_id)
+        return query
+
+    @staticmethod
+    async def get_utilization(week_start: date, weeks: int = 1, hall_id: Optional[int] = None) -> List[dict]:
+        """
+        Средняя загрузка залов по часам недели за weeks недель, начиная с week_start.
+        Процент — доля занятых минут часа; общий процент — доля от всех часов работы.
+        """
+        from app.config import settings
+
+        open_hour, close_hour = settings.HALL_OPEN_HOUR, settings.HALL_CLOSE_HOUR
+        tz = settings.school_tz
+        window_start = dt.combine(week_start, time.min, tzinfo=tz)
+        window_end = dt.combine(week_start + timedelta(weeks=weeks), time.min, tzinfo=tz)
+
+        halls_query = select(Hall.id, Hall.name).order_by(Hall.id)
+        if hall_id is not None:
+            halls_query = halls_query.where(Hall.id == hall_id)
+
+        async with session_scope() as session:
+            halls = (await session.execute(halls_query)).all()
+            usage = (await session.execute(
+                Hall.utilization_query(window_start, window_end, open_hour, close_hour, settings.SCHOOL_TIMEZONE, hall_id)
+            )).all()
+
+        minutes = {(row.hall_id, int(row.weekday), int(row.hour)): row.minutes for row in usage}
+        hour_minutes = 60 * weeks
+        result = []
+        for hall in halls:
+            hours = [
+                {
+                    "weekday": weekday,
+                    "hour": hour,
+                    "occupied_minutes": minutes.get((hall.id, weekday, hour), 0),
+                    "occupancy": round(100 * minutes.get((hall.id, weekday, hour), 0) / hour_minutes, 1),
+                }
+                for weekday in range(1, 8)
+                for hour in range(open_hour, close_hour)
+            ]
+            total = sum(item["occupied_minutes"] for item in hours)
+            result.append({
+                "hall_id": hall.id,
+                "hall_name": hall.name,
+                "occupied_minutes": total,
+                "occupancy": round(100 * total / (hour_minutes * len(hours)), 1) if hours else 0.0,
+                "hours": hours,
+            })
+        return result
+
+    @staticmethod
+    async def rebuild_usage() -> None:
+        async with session_scope() as session:
+            for statement in HALL_USAGE_REBUILD:
+                await session.execute(text(statement))
+            await session.commit()
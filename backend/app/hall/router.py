@@ -1,20 +1,70 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy import select
 from app.database import async_session_maker
-from app.hall.schemas import HallSchema
+from app.hall.schemas import HallSchema, CapacityViolationSchema, HallUtilizationSchema
 from app.hall.models import Hall
-from app.middleware import get_current_user
+from app.middleware import get_current_user, require_roles
 from app.user.schemas import UserSchema
+from app.pagination import PageParams, page_response
+from app.cache import cached_response
 
 hall_router = APIRouter(prefix="/halls", tags=["Залы"])
 
 @hall_router.get("/", response_model=List[HallSchema], summary="Получение списка всех залов")
-async def get_halls(current_user: UserSchema = Depends(get_current_user)):
+async def get_halls(
+    page: PageParams = Depends(),
+    current_user: UserSchema = Depends(get_current_user),
+):
     """
-    Возвращает список всех доступных залов.
+    Возвращает страницу доступных залов.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
     """
-    async with async_session_maker() as session:
-        result = await session.execute(select(Hall))
-        halls = result.scalars().all()
-        return halls
\ No newline at end of file
+    halls = await Hall.get_halls(
+        after_id=page.after_id, limit=page.fetch_limit, fields=page.selected_fields(HallSchema)
+    )
+    return page_response(halls, HallSchema, page)
+
+@hall_router.get(
+    "/capacity-audit",
+    response_model=List[CapacityViolationSchema],
+    summary="Тренировки, в которых группа больше вместимости зала",
+)
+async def capacity_audit(
+    page: PageParams = Depends(),
+    current_user: UserSchema = Depends(require_roles("admin")),
+):
+    """
+    Возвращает страницу тренировок, участников которых больше, чем вмещает зал.
+    Результат считается одним агрегирующим запросом; курсор — в заголовке X-Next-Cursor.
+    """
+    violations = await Hall.get_capacity_violations(after_id=page.after_id, limit=page.fetch_limit)
+    return page_response(violations, CapacityViolationSchema, page)
+
+# Загрузка залов зависит от тренировок и списка залов
+UTILIZATION_ENTITIES = ("trainings", "halls")
+# Максимальное окно отчета — год
+UTILIZATION_MAX_WEEKS = 53
+
+@hall_router.get(
+    "/utilization",
+    response_model=List[HallUtilizationSchema],
+    summary="Загрузка залов по часам недели",
+)
+async def get_utilization(
+    request: Request,
+    week_start: date = Query(..., description="Первый день окна отчета"),
+    weeks: int = Query(1, ge=1, le=UTILIZATION_MAX_WEEKS, description="Длина окна в неделях"),
+    hall_id: Optional[int] = Query(None, description="Только один зал"),
+    current_user: UserSchema = Depends(require_roles("admin")),
+):
+    """
+    Процент занятости каждого часа работы залов (по дням недели), усредненный за окно.
+    Считается по агрегату hall_usage, который триггеры обновляют при каждой записи тренировок.
+    """
+    async def build():
+        return await Hall.get_utilization(week_start, weeks, hall_id)
+
+    key = ("hall_utilization", week_start, weeks, hall_id)
+    return await cached_response(request, key, UTILIZATION_ENTITIES, build)
@@ -1,3 +1,5 @@
+from datetime import datetime
+from typing import List
 from pydantic import BaseModel
 
 class HallSchema(BaseModel):
@@ -6,4 +8,26 @@ class HallSchema(BaseModel):
     capacity: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CapacityViolationSchema(BaseModel):
+    id: int  # ID тренировки
+    start_time: datetime
+    end_time: datetime
+    hall_id: int
+    hall_name: str
+    capacity: int
+    participants: int
+
+class HourOccupancySchema(BaseModel):
+    weekday: int  # 1 — понедельник, 7 — воскресенье (в часовом поясе школы)
+    hour: int  # Начало часа (в часовом поясе школы)
+    occupied_minutes: int
+    occupancy: float  # Процент занятости часа
+
+class HallUtilizationSchema(BaseModel):
+    hall_id: int
+    hall_name: str
+    occupied_minutes: int
+    occupancy: float  # Процент занятости за все часы работы
+    hours: List[HourOccupancySchema]
@@ -0,0 +1,40 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine, pool_stats
+
+health_router = APIRouter(prefix="/health", tags=["Состояние сервиса"])
+
+@health_router.get("", summary="Проверка живости процесса")
+async def health():
+    """
+    Liveness-проверка: процесс отвечает. К БД не обращается.
+    """
+    return {"status": "ok"}
+
+@health_router.get("/ready", summary="Проверка готовности (доступность БД)")
+async def ready():
+    """
+    Readiness-проверка: выполняет SELECT 1 с таймаутом HEALTH_DB_TIMEOUT.
+    При недоступности БД возвращает 503.
+    """
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), timeout=settings.HEALTH_DB_TIMEOUT)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+
+    return {"status": "ok", "pool": pool_stats.snapshot()}
+
+@health_router.get("/pool", summary="Статистика пула соединений")
+async def pool():
+    """
+    Текущее состояние пула соединений этого воркера и время ожидания соединений.
+    """
+    return pool_stats.snapshot()
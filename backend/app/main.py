@@ -1,17 +1,29 @@
+import os
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from app.database import create_db_and_tables
+from app.database import engine
 from app.user.router import user_router
 from app.coach.router import coach_router
 from app.test.router import test_router
 from app.training.router import training_router
 from app.group.router import group_router
 from app.hall.router import hall_router
+from app.health.router import health_router
+from app.calendar.router import calendar_router
+from app.config import settings
+from app.middleware import RequestSessionMiddleware, MetricsMiddleware, ProfilingMiddleware
+from app import metrics
+from app.metrics import metrics_router, app_startup_seconds, process_rss_bytes
 
 async def lifespan(app: FastAPI):
-    await create_db_and_tables(app)
+    # Схема БД создается отдельным шагом (python -m app.migrate), а не при каждом запуске
+    startup_seconds = time.perf_counter() - metrics.process_started
+    app_startup_seconds.set(value=startup_seconds)
+    print(f"Воркер {os.getpid()} запущен за {startup_seconds:.2f} с, память: {process_rss_bytes() / 2**20:.1f} МБ")
     yield
+    await engine.dispose()
 
 
 # Создаем экземпляр FastAPI
@@ -24,6 +36,16 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Метрики запроса (внутри RequestSessionMiddleware, чтобы видеть SQL-статистику)
+app.add_middleware(MetricsMiddleware)
+
+# Одна сессия БД на запрос
+app.add_middleware(RequestSessionMiddleware)
+
+# Профилирование отдельных запросов — только в DEBUG, иначе middleware не подключается
+if settings.DEBUG:
+    app.add_middleware(ProfilingMiddleware)
+
 # Настройка CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +53,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Checkouts", "ETag", "Last-Modified", "X-Profile-File"],
 )
 
 app.include_router(user_router)
@@ -39,8 +62,11 @@ app.include_router(test_router)
 app.include_router(training_router)
 app.include_router(group_router)
 app.include_router(hall_router)
+app.include_router(health_router)
+app.include_router(calendar_router)
+app.include_router(metrics_router)
 
-# Запуск сервера
+# Запуск сервера для разработки (в продакшене — gunicorn -c gunicorn.conf.py)
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,191 @@
+"""
+Минимальный реестр метрик в текстовом формате Prometheus.
+Метрики хранятся в памяти процесса; каждый воркер отдает свои значения на /metrics
+с меткой worker (pid процесса). Так ряды разных воркеров gunicorn не смешиваются
+и сброс счетчиков одного воркера не выглядит как откат общего счетчика;
+агрегируйте по воркерам в запросе, например sum without (worker) (...).
+"""
+import os
+import resource
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+LabelValues = Tuple[str, ...]
+
+# Границы бакетов по умолчанию, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+
+    @abstractmethod
+    def render(self, worker: str) -> List[str]:
+        """Строки метрики в текстовом формате; worker добавляется первой меткой каждого ряда."""
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, worker: str) -> List[str]:
+        label_names = ("worker",) + self.labels
+        return self.header() + [
+            f"{self.name}{format_labels(label_names, (worker,) + values)} {value}"
+            for values, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values: str, value: float) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, *label_values: str, value: float) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(label_values, [0] * (len(self.buckets) + 1))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._sums[label_values] = self._sums.get(label_values, 0.0) + value
+
+    def render(self, worker: str) -> List[str]:
+        lines = self.header()
+        label_names = ("worker",) + self.labels
+        for label_values, counts in sorted(self._counts.items()):
+            values = (worker,) + label_values
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{format_labels(label_names + ('le',), values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(label_names, values)} {self._sums[label_values]}")
+            lines.append(f"{self.name}_count{format_labels(label_names, values)} {cumulative}")
+        return lines
+
+
+# --- Метрики приложения ---
+
+http_requests_in_flight = Gauge("http_requests_in_flight", "Запросы, обрабатываемые в данный момент")
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", labels=("method", "route", "status")
+)
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "Количество SQL-запросов на один HTTP-запрос", labels=("route",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 500),
+)
+db_time_seconds = Histogram("db_time_seconds", "Время в БД на один HTTP-запрос", labels=("route",))
+db_pool_checkouts_per_request = Histogram(
+    "db_pool_checkouts_per_request", "Выдачи соединений из пула на один HTTP-запрос", labels=("route",),
+    buckets=(0, 1, 2, 3, 5, 10),
+)
+password_hash_seconds = Histogram(
+    "password_hash_seconds", "Время хэширования и проверки пароля (argon2)", labels=("operation",)
+)
+db_pool_connections = Gauge("db_pool_connections", "Состояние пула соединений", labels=("state",))
+process_resident_memory_bytes = Gauge("process_resident_memory_bytes", "Резидентная память процесса воркера")
+app_startup_seconds = Gauge(
+    "app_startup_seconds", "Холодный старт воркера: от запуска процесса (fork в gunicorn) до готовности приложения"
+)
+
+# Момент запуска процесса: импорт модуля, а в gunicorn с preload_app — fork воркера (см. mark_process_start)
+process_started = time.perf_counter()
+
+
+def mark_process_start() -> None:
+    global process_started
+    process_started = time.perf_counter()
+
+REGISTRY: List[Metric] = [
+    http_requests_in_flight,
+    http_request_duration_seconds,
+    db_queries_per_request,
+    db_time_seconds,
+    db_pool_checkouts_per_request,
+    password_hash_seconds,
+    db_pool_connections,
+    process_resident_memory_bytes,
+    app_startup_seconds,
+]
+
+
+def process_rss_bytes() -> int:
+    """
+    Текущая резидентная память процесса. Без /proc (не Linux) — пиковое значение.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def render_metrics() -> str:
+    from app.database import pool_stats
+
+    pool = pool_stats.snapshot()
+    for state in ("checked_in", "checked_out", "overflow"):
+        db_pool_connections.set(state, value=pool[state])
+    process_resident_memory_bytes.set(value=process_rss_bytes())
+
+    # pid берется при каждом рендере: с preload_app модуль импортируется в мастере до fork
+    worker = str(os.getpid())
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(worker))
+    lines.append("# HELP db_pool_wait_seconds_total Суммарное время ожидания соединения из пула")
+    lines.append("# TYPE db_pool_wait_seconds_total counter")
+    lines.append(f"db_pool_wait_seconds_total{format_labels(('worker',), (worker,))} {pool['wait_seconds_total']}")
+    return "\n".join(lines) + "\n"
+
+
+metrics_router = APIRouter(tags=["Состояние сервиса"])
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, summary="Метрики в формате Prometheus")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,18 +1,66 @@
+import asyncio
+import cProfile
+import logging
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs
+
 from fastapi import Depends, HTTPException
 from fastapi.security import SecurityScopes
 from jose import JWTError, jwt
 from starlette.middleware import Middleware
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send
 from starlette.status import HTTP_403_FORBIDDEN
-from typing import Callable, Awaitable
+from typing import Callable, Awaitable, List
 
-from app.database import async_session_maker
+from app.cache import TTLCache
+from app.config import settings
+from app.database import session_scope, request_scope, RequestScope
+from app.metrics import (
+    db_pool_checkouts_per_request,
+    db_queries_per_request,
+    db_time_seconds,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+)
 from app.user.models import User
 from app.user.schemas import UserSchema
+from app.utils import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger("app.requests")
+
+# Кэш принципалов по ID пользователя — используется для токенов без claims
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """
+    Сбрасывает закэшированные данные пользователя.
+    Вызывается при выходе из системы и при изменении ролей.
+    """
+    principal_cache.delete(int(user_id))
+
+
+def principal_from_claims(user_id: int, payload: dict) -> UserSchema | None:
+    """
+    Собирает пользователя из claims токена без обращения к базе данных.
+    """
+    name = payload.get("name")
+    roles = payload.get("roles")
+    if name is None or roles is None:
+        return None
+    return principal_from_roles(user_id, name, roles)
+
+
+def principal_from_roles(user_id: int, name: str, roles: List[str]) -> UserSchema:
+    return UserSchema(
+        id=user_id, name=name, isAdmin="admin" in roles, isCoach="coach" in roles, isAthlete="athlete" in roles
+    )
 
-SECRET_KEY = "YOUR_SECRET_KEY"
-ALGORITHM = "HS256"
 
 async def get_current_user(security_scopes: SecurityScopes, request: Request) -> UserSchema:
     """
@@ -43,10 +91,171 @@ async def get_current_user(security_scopes: SecurityScopes, request: Request) ->
     except JWTError:
         raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Invalid token")
 
-    async with async_session_maker() as session:
-        user = await session.get(User, int(user_id))
+    user_id = int(user_id)
+
+    # 1. Токен с claims — пользователь полностью описан подписанными данными
+    if principal := principal_from_claims(user_id, payload):
+        return principal
+
+    # 2. Старый токен без claims — пробуем кэш принципалов
+    if principal := principal_cache.get(user_id):
+        return principal
+
+    # 3. Загружаем пользователя из БД
+    async with session_scope() as session:
+        user = await session.get(User, user_id)
         if user is None:
             raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="User not found")
 
-        return UserSchema(id=user.id, name=user.full_name, isAdmin= await User.is_admin(user_id=user.id), isAthlete= await User.is_athlete(user_id=user.id))
+        # Роли — из той же строки users (дискриминатор role и флаг admin)
+        principal = principal_from_roles(user.id, user.full_name, User.roles_of(user.role, user.admin))
+        principal_cache.set(user_id, principal)
+        return principal
+
+
+def require_roles(*roles: str) -> Callable[..., Awaitable[UserSchema]]:
+    """
+    Зависимость FastAPI: пропускает пользователя, у которого есть хотя бы одна из ролей.
+    Роли берутся из принципала (claims токена), без запросов к базе данных.
+
+    Пример: current_user: UserSchema = Depends(require_roles("admin", "coach"))
+    """
+    async def check_roles(current_user: UserSchema = Depends(get_current_user)) -> UserSchema:
+        user_roles = {
+            "admin": current_user.isAdmin,
+            "coach": current_user.isCoach,
+            "athlete": current_user.isAthlete,
+        }
+        if not any(user_roles.get(role) for role in roles):
+            raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Недостаточно прав")
+        return current_user
+
+    return check_roles
+
+
+class RequestSessionMiddleware:
+    """
+    ASGI-middleware, которое открывает область БД на время запроса:
+    все методы моделей внутри запроса используют одну сессию (см. session_scope).
+    Количество выдач соединений из пула возвращается в заголовке X-DB-Checkouts.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = RequestScope()
+        token = request_scope.set(state)
+
+        async def send_with_checkouts(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Checkouts", str(state.checkouts))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_checkouts)
+        finally:
+            await state.close()
+            request_scope.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware для метрик: время ответа по шаблону маршрута, число запросов
+    в обработке и SQL-статистика запроса (количество запросов, время в БД, выдачи из пула).
+    Должно стоять внутри RequestSessionMiddleware, чтобы видеть область БД запроса.
+    Медленные запросы (дольше SLOW_REQUEST_MS) пишутся в лог с числом SQL-запросов.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            # Шаблон маршрута (/coaches/{coach_id}), а не фактический путь — иначе метки не ограничены
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration_seconds.observe(scope["method"], route, str(status_code), value=duration)
+
+            state = request_scope.get()
+            if state is not None:
+                db_queries_per_request.observe(route, value=state.queries)
+                db_time_seconds.observe(route, value=state.db_time)
+                db_pool_checkouts_per_request.observe(route, value=state.checkouts)
+
+                if duration * 1000 > settings.SLOW_REQUEST_MS:
+                    logger.warning(
+                        "Медленный запрос %s %s: %.0f мс, SQL-запросов: %d, время в БД: %.0f мс",
+                        scope["method"], route, duration * 1000, state.queries, state.db_time * 1000,
+                    )
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware для профилирования одного запроса (подключается только при DEBUG).
+    Включается заголовком X-Profile: 1 или параметром ?profile=1. Профиль cProfile
+    сохраняется в PROFILE_DIR, имя файла возвращается в заголовке X-Profile-File.
+    Файл открывается snakeviz или переводится во flamegraph через flameprof.
+
+    Профилировщик видит все корутины event loop, поэтому профилируемые запросы
+    выполняются по одному; на нагруженном стенде в профиль попадут и соседние запросы.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.lock = asyncio.Lock()
+        self.profile_dir = Path(settings.PROFILE_DIR)
+
+    @staticmethod
+    def is_requested(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and value not in (b"", b"0"):
+                return True
+        query = parse_qs(scope.get("query_string", b"").decode())
+        return query.get("profile", ["0"])[0] not in ("", "0")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path_slug = scope["path"].strip("/").replace("/", "_") or "root"
+        filename = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{scope['method']}-{path_slug}.prof"
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-File", filename)
+            await send(message)
 
+        async with self.lock:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_profile)
+            finally:
+                profiler.disable()
+                profiler.dump_stats(self.profile_dir / filename)
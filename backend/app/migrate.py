@@ -0,0 +1,84 @@
+"""
+Явный шаг миграции схемы БД: расширения, недостающие таблицы, колонки, ограничения и индексы.
+Выполняется один раз перед запуском воркеров, а не при старте каждого процесса.
+
+Запуск:
+    python -m app.migrate
+"""
+import asyncio
+import time
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.cache import ENTITY_VERSION_TRIGGER_DDL
+from app.database import Base, engine
+
+# Регистрируем все модели в Base.metadata
+import app.athlete.models  # noqa: F401
+import app.coach.models  # noqa: F401
+from app.group.models import Group, MEMBER_COUNT_TRIGGER_DDL
+from app.hall.models import Hall, HALL_USAGE_TRIGGER_DDL
+import app.specialization.models  # noqa: F401
+import app.training.models  # noqa: F401
+import app.training_hall.models  # noqa: F401
+import app.user.models  # noqa: F401
+
+# Колонки, добавленные в существующие таблицы после их создания (create_all их не добавляет)
+UPGRADE_STATEMENTS = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(20) NOT NULL DEFAULT 'user'",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS admin BOOLEAN NOT NULL DEFAULT false",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS calendar_token_hash VARCHAR(64)",
+    # Дискриминатор для пользователей, созданных до его появления
+    "UPDATE users SET role = 'coach' WHERE role = 'user' AND id IN (SELECT id FROM coaches)",
+    "UPDATE users SET role = 'athlete' WHERE role = 'user' AND id IN (SELECT id FROM athletes)",
+    "ALTER TABLE groups ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0",
+    # Занятость зала как диапазон: заполняется из тренировок, затем становится обязательной
+    "ALTER TABLE training_halls ADD COLUMN IF NOT EXISTS during TSTZRANGE",
+    """
+    UPDATE training_halls SET during = tstzrange(trainings.start_time, trainings.end_time, '[)')
+    FROM trainings
+    WHERE trainings.id = training_halls.training_id AND training_halls.during IS NULL
+    """,
+    "ALTER TABLE training_halls ALTER COLUMN during SET NOT NULL",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'training_halls_no_overlap') THEN
+            ALTER TABLE training_halls ADD CONSTRAINT training_halls_no_overlap
+                EXCLUDE USING gist (hall_id WITH =, during WITH &&);
+        END IF;
+    END
+    $$
+    """,
+]
+
+
+async def migrate() -> None:
+    async with engine.begin() as conn:
+        # btree_gist нужен для ограничения-исключения по (hall_id, during)
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in UPGRADE_STATEMENTS:
+            await conn.execute(text(statement))
+        # Индексы, объявленные на моделях после создания таблиц
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                await conn.execute(CreateIndex(index, if_not_exists=True))
+        for statement in MEMBER_COUNT_TRIGGER_DDL + HALL_USAGE_TRIGGER_DDL + ENTITY_VERSION_TRIGGER_DDL:
+            await conn.execute(text(statement))
+    # Счетчики участников, накопленные до установки триггера
+    await Group.reconcile_member_counts()
+    # Агрегат занятости залов для тренировок, созданных до установки триггеров
+    await Hall.rebuild_usage()
+    await engine.dispose()
+
+
+def main() -> None:
+    started = time.perf_counter()
+    asyncio.run(migrate())
+    print(f"Схема БД обновлена за {time.perf_counter() - started:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
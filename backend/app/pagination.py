@@ -0,0 +1,111 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Заголовок, в котором возвращается курсор следующей страницы.
+# Тело ответа остается списком, поэтому клиенты без пагинации не ломаются.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Упаковывает значения ключа последней записи страницы в непрозрачную строку.
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> List[Any]:
+    """
+    Распаковывает курсор, выданный encode_cursor, и приводит каждое значение
+    соответствующим парсером (например, datetime.fromisoformat, int).
+    Некорректный курсор — ошибка 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError(cursor)
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 500
+
+
+class PageParams:
+    """
+    Общие параметры списочных эндпоинтов: курсор, размер страницы и список полей.
+    Подключается в роутерах через Depends(PageParams).
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description=f"Курсор следующей страницы из заголовка {NEXT_CURSOR_HEADER}"),
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT, description="Количество записей на странице"),
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, например: id,name"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+    @property
+    def after_id(self) -> Optional[int]:
+        return decode_cursor(self.cursor, int)[0] if self.cursor else None
+
+    @property
+    def fetch_limit(self) -> int:
+        # На одну запись больше, чтобы понять, есть ли следующая страница
+        return self.limit + 1
+
+    def selected_fields(self, schema: Type[BaseModel]) -> Optional[List[str]]:
+        """
+        Возвращает запрошенные поля в порядке схемы (id добавляется всегда — он нужен курсору).
+        None — поля не ограничены.
+        """
+        if self.fields is None:
+            return None
+        unknown = set(self.fields) - set(schema.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(sorted(unknown))}")
+        requested = set(self.fields) | {"id"}
+        return [field for field in schema.model_fields if field in requested]
+
+
+def keyset_by_id(query, id_column, after_id: Optional[int], limit: Optional[int]):
+    """
+    Добавляет к запросу пагинацию по ключу: id > after_id ORDER BY id LIMIT limit.
+    """
+    if after_id is not None:
+        query = query.where(id_column > after_id)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def page_response(items: Sequence[Dict[str, Any]], schema: Type[BaseModel], params: PageParams) -> JSONResponse:
+    """
+    Формирует ответ со страницей: обрезает лишнюю запись, выставляет курсор
+    следующей страницы и оставляет только запрошенные поля.
+    """
+    next_cursor = None
+    if len(items) > params.limit:
+        items = items[: params.limit]
+        next_cursor = encode_cursor([items[-1]["id"]])
+
+    fields = params.selected_fields(schema)
+    if fields is None:
+        content = [schema.model_validate(item).model_dump(mode="json") for item in items]
+    else:
+        content = jsonable_encoder([{field: item[field] for field in fields} for item in items])
+
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=content, headers=headers)
@@ -0,0 +1,32 @@
+"""
+Сверка groups.member_count с group_athletes. Счетчики поддерживает триггер,
+сверка нужна только после ручных правок данных при отключенных триггерах.
+Запускается одним процессом (например, из cron), а не в каждом воркере.
+
+Запуск:
+    python -m app.reconcile
+"""
+import asyncio
+
+from app.database import engine
+
+# Регистрируем все модели в Base.metadata
+import app.migrate  # noqa: F401
+from app.group.models import Group
+
+
+async def reconcile() -> None:
+    fixed = await Group.reconcile_member_counts()
+    if fixed:
+        print(f"Исправлены счетчики участников групп: {fixed}")
+    else:
+        print("Счетчики участников групп совпадают с составом")
+    await engine.dispose()
+
+
+def main() -> None:
+    asyncio.run(reconcile())
+
+
+if __name__ == "__main__":
+    main()
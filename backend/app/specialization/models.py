@@ -4,7 +4,7 @@ from app.database import Base
 from sqlalchemy import Identity
 from typing import List
 from app.group.models import group_coaches
-from app.database import async_session_maker
+from app.database import session_scope
 from app.specialization.coach_sport_type import CoachSportType # Импортируем CoachSportType
 
 class SportType(Base):
@@ -20,7 +20,7 @@ class SportType(Base):
 
     @staticmethod
     async def get_specializations(coach_id: int) -> List[str]:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             specializations = await session.execute(
                 select(SportType.name)
                 .join(CoachSportType, CoachSportType.sport_type_id == SportType.id)
@@ -34,7 +34,7 @@ class SportType(Base):
         Статический метод для получения названий специализаций,
         связанных с тренерами указанной группы.
         """
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             # Запрос, который связывает SportType -> CoachSportType -> group_coaches
             query = (
                 select(SportType.name)
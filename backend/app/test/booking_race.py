@@ -0,0 +1,125 @@
+"""
+Проверка бронирования под конкурентной нагрузкой.
+
+В каждом раунде несколько групп с разными тренерами одновременно бронируют
+один и тот же зал на один и тот же слот (Training.create_training, каждый вызов —
+в своей сессии на отдельном соединении). Проверка падает, если в раунде
+успешно прошло не ровно одно бронирование или в зале оказалось больше одной
+тренировки в этом слоте. Созданные тренировки в конце удаляются.
+
+Запуск:
+    python -m app.test.booking_race --generate --scale 1
+    python -m app.test.booking_race --parallel 10 --rounds 20
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from typing import List
+
+from sqlalchemy import delete, func, select
+
+from app.database import async_session_maker, engine
+
+
+async def pick_targets(parallel: int):
+    """
+    Самый вместительный зал и до parallel групп, которые в него помещаются
+    и не делят тренеров между собой (иначе отказ будет из-за тренера, а не зала).
+    """
+    from app.group.models import Group, group_coaches
+    from app.hall.models import Hall
+    from app.training.models import Training
+
+    async with async_session_maker() as session:
+        hall_id, capacity = (await session.execute(
+            select(Hall.id, Hall.capacity).order_by(Hall.capacity.desc(), Hall.id).limit(1)
+        )).one()
+        rows = (await session.execute(
+            select(Group.id, func.array_agg(group_coaches.c.coach_id).label("coach_ids"))
+            .join(group_coaches, group_coaches.c.group_id == Group.id)
+            .where(Group.member_count <= capacity)
+            .group_by(Group.id)
+            .order_by(Group.id)
+        )).all()
+        # Слоты раундов — после последней тренировки в базе, чтобы они были свободны
+        latest = (await session.execute(select(func.max(Training.end_time)))).scalar_one()
+
+    group_ids, used_coaches = [], set()
+    for row in rows:
+        if used_coaches.isdisjoint(row.coach_ids):
+            group_ids.append(row.id)
+            used_coaches.update(row.coach_ids)
+        if len(group_ids) == parallel:
+            break
+    return hall_id, group_ids, latest
+
+
+async def run(generate_data: bool, scale: float, parallel: int, rounds: int) -> int:
+    from app.training.models import Training
+    from app.training_hall.models import TrainingHall
+    from app.group.models import training_groups
+
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=1)
+
+    hall_id, group_ids, latest = await pick_targets(parallel)
+    if len(group_ids) < 2 or latest is None:
+        print("Недостаточно данных: нужны тренировки и хотя бы две группы с разными тренерами")
+        return 1
+    print(f"Зал {hall_id}, групп в гонке: {len(group_ids)}, раундов: {rounds}")
+
+    failures: List[str] = []
+    slot_start = latest.replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for round_number in range(rounds):
+        start = slot_start + timedelta(hours=2 * round_number)
+        end = start + timedelta(minutes=90)
+        results = await asyncio.gather(*(
+            Training.create_training(start, end, group_id, hall_id) for group_id in group_ids
+        ))
+        succeeded = [message for ok, message in results if ok]
+        rejected = {message for ok, message in results if not ok}
+
+        async with async_session_maker() as session:
+            booked = (await session.execute(
+                select(func.count()).select_from(TrainingHall).where(
+                    TrainingHall.hall_id == hall_id,
+                    TrainingHall.during.op("&&")(func.tstzrange(start, end, "[)")),
+                )
+            )).scalar_one()
+
+        print(f"раунд {round_number + 1}: успешно {len(succeeded)}, отказов {len(results) - len(succeeded)}, в зале {booked}")
+        if len(succeeded) != 1 or booked != 1:
+            failures.append(f"раунд {round_number + 1}: успешных бронирований {len(succeeded)}, тренировок в слоте {booked}")
+        unexpected = {message for message in rejected if "уже занят" not in message}
+        if unexpected:
+            failures.append(f"раунд {round_number + 1}: неожиданные ответы: {sorted(unexpected)}")
+
+    # Удаляем тренировки, созданные проверкой
+    async with async_session_maker() as session:
+        created = select(Training.id).where(Training.start_time >= slot_start)
+        await session.execute(delete(TrainingHall).where(TrainingHall.training_id.in_(created)))
+        await session.execute(delete(training_groups).where(training_groups.c.training_id.in_(created)))
+        await session.execute(delete(Training).where(Training.start_time >= slot_start))
+        await session.commit()
+
+    await engine.dispose()
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Параллельные бронирования одного слота")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=1, help="Масштаб генерируемых данных")
+    parser.add_argument("--parallel", type=int, default=10, help="Одновременных бронирований в раунде")
+    parser.add_argument("--rounds", type=int, default=20, help="Количество раундов")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.parallel, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Сравнение справочника тренеров (Coach.get_coaches, один агрегирующий запрос)
+с прежней схемой: список тренеров и пять отдельных запросов на каждого
+(контакты, специализации, стаж, био, имя), каждый в своей сессии.
+
+Для 1000 тренеров нужен набор масштаба 20 (50 тренеров на единицу масштаба).
+
+Запуск:
+    python -m app.test.coach_directory_bench --generate --scale 20
+    python -m app.test.coach_directory_bench --sizes 10 100 1000 --repeat 5
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import select
+
+from app.database import async_session_maker, engine
+from app.test.counting import counted_scope
+
+
+async def legacy_directory(limit: int) -> List[dict]:
+    """
+    Прежний путь GET /coaches: 1 + 5 * N запросов.
+    """
+    from app.coach.models import Coach
+    from app.specialization.models import SportType
+
+    async with async_session_maker() as session:
+        coach_ids = list((await session.execute(select(Coach.id).order_by(Coach.id).limit(limit))).scalars().all())
+
+    directory = []
+    for coach_id in coach_ids:
+        contact_info = await Coach.get_contact_info(coach_id)
+        directory.append({
+            "id": coach_id,
+            "experience_years": await Coach.get_experience_years(coach_id),
+            "bio": await Coach.get_bio(coach_id),
+            "full_name": await Coach.get_full_name(coach_id),
+            "email": contact_info.get("email"),
+            "specialization": await SportType.get_specializations(coach_id),
+        })
+    return directory
+
+
+async def directory(limit: int) -> List[dict]:
+    from app.coach.models import Coach
+
+    return await Coach.get_coaches(limit=limit)
+
+
+async def measure(load: Callable[[int], Awaitable[List[dict]]], size: int, repeat: int) -> dict:
+    # Число запросов считается отдельным прогоном: внутри counted_scope все методы делят одну сессию
+    async with counted_scope() as scope:
+        rows = len(await load(size))
+        queries = scope.queries
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await load(size)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"rows": rows, "queries": queries, "median_ms": round(statistics.median(timings), 1)}
+
+
+async def run(generate_data: bool, scale: float, sizes: List[int], repeat: int) -> int:
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=1)
+
+    failed = False
+    for size in sizes:
+        new = await measure(directory, size, repeat)
+        old = await measure(legacy_directory, size, repeat)
+        speedup = old["median_ms"] / new["median_ms"] if new["median_ms"] else float("inf")
+        print(
+            f"{size} тренеров (получено {new['rows']}): "
+            f"один запрос — {new['median_ms']} мс, {new['queries']} SQL; "
+            f"прежний путь — {old['median_ms']} мс, {old['queries']} SQL; ускорение x{speedup:.1f}"
+        )
+        if new["rows"] < size:
+            print(f"ПРЕДУПРЕЖДЕНИЕ: в базе меньше {size} тренеров, увеличьте --scale")
+        if new["queries"] != 1:
+            print(f"ОШИБКА: справочник из {size} тренеров собран за {new['queries']} запросов")
+            failed = True
+
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сравнение справочника тренеров с прежней схемой N+1")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=20, help="Масштаб генерируемых данных")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Размеры страницы справочника")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого замера")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.sizes, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Подсчет SQL-запросов вне HTTP-запроса для проверок и замеров в app/test.
+
+Использует те же события движка, что и метрики (см. app/database.py):
+пока активен counted_scope(), все запросы методов моделей идут через
+одну сессию и учитываются в RequestScope.queries.
+"""
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.database import RequestScope, request_scope
+
+
+@asynccontextmanager
+async def counted_scope() -> AsyncIterator[RequestScope]:
+    scope = RequestScope()
+    token = request_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        await scope.close()
+        request_scope.reset(token)
@@ -0,0 +1,233 @@
+"""
+Детерминированный генератор тестовых данных для нагрузочного тестирования.
+
+Размер набора задается коэффициентом масштаба (scale), содержимое — зерном
+генератора случайных чисел (seed): одинаковые параметры всегда дают одинаковую базу.
+Данные загружаются через COPY, пароль хэшируется один раз для всех пользователей,
+а расписание строится без пересечений по залам и тренерам.
+
+Запуск:
+    python -m app.test.generator --scale 100 --seed 42 --weeks 52
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+from asyncpg import Range
+from sqlalchemy import select
+
+from app.database import engine, async_session_maker
+from app.utils import get_password_hash
+
+# --- Размеры набора при scale=1 ---
+
+ATHLETES_PER_SCALE = 1000
+COACHES_PER_SCALE = 50
+GROUPS_PER_SCALE = 40
+HALLS_PER_SCALE = 10
+
+SESSIONS_PER_WEEK = 3
+TRAINING_DURATION = timedelta(minutes=90)
+# Сетка слотов недели: начало каждого слота (часы), слоты не пересекаются
+SLOT_HOURS = [8, 10, 12, 14, 16, 18, 20]
+
+DEFAULT_PASSWORD = "password"
+
+SPORT_TYPES = [
+    ("Плавание", "Отработка техники плавания."),
+    ("Бокс", "Освоение ударной техники."),
+    ("Йога", "Практика асан и медитации."),
+    ("Кроссфит", "Высокоинтенсивные функциональные тренировки."),
+    ("Тяжелая атлетика", "Работа со штангой."),
+    ("Борьба", "Изучение техник единоборств."),
+]
+
+FIRST_NAMES = ["Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Анастасия", "Мария", "Анна", "Дарья", "Екатерина"]
+SURNAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Федоров"]
+
+
+class Dataset:
+    """
+    Описание сгенерированного набора: справочники целиком в памяти,
+    тренировки — в виде недельного шаблона, который разворачивается при загрузке.
+    """
+
+    def __init__(self, scale: float, seed: int, weeks: int, start_date: date):
+        self.rng = random.Random(seed)
+        self.weeks = weeks
+        self.start_date = start_date - timedelta(days=start_date.weekday())
+
+        self.athletes_count = max(1, int(ATHLETES_PER_SCALE * scale))
+        self.coaches_count = max(1, int(COACHES_PER_SCALE * scale))
+        self.groups_count = max(1, int(GROUPS_PER_SCALE * scale))
+        self.halls_count = max(1, int(HALLS_PER_SCALE * scale))
+
+        # ID пользователей: сначала тренеры, затем атлеты
+        self.coach_ids = list(range(1, self.coaches_count + 1))
+        self.athlete_ids = list(range(self.coaches_count + 1, self.coaches_count + self.athletes_count + 1))
+        self.group_ids = list(range(1, self.groups_count + 1))
+        self.hall_ids = list(range(1, self.halls_count + 1))
+
+        self.group_coach = {group_id: self.coach_ids[i % self.coaches_count] for i, group_id in enumerate(self.group_ids)}
+        self.group_hall = {group_id: self.hall_ids[i % self.halls_count] for i, group_id in enumerate(self.group_ids)}
+        self.group_members: Dict[int, List[int]] = {group_id: [] for group_id in self.group_ids}
+        for i, athlete_id in enumerate(self.athlete_ids):
+            self.group_members[self.group_ids[i % self.groups_count]].append(athlete_id)
+
+        self.weekly_template = self._build_weekly_template()
+
+    def _build_weekly_template(self) -> List[Tuple[int, int, int]]:
+        """
+        Жадно раскладывает занятия групп по сетке недели так, чтобы ни зал,
+        ни тренер не были заняты дважды в одном слоте.
+        Возвращает список (group_id, weekday, hour).
+        """
+        slots = [(weekday, hour) for weekday in range(7) for hour in SLOT_HOURS]
+        hall_busy = set()
+        coach_busy = set()
+        template = []
+        for group_id in self.group_ids:
+            hall_id, coach_id = self.group_hall[group_id], self.group_coach[group_id]
+            candidates = slots[:]
+            self.rng.shuffle(candidates)
+            placed = 0
+            for slot in candidates:
+                if placed == SESSIONS_PER_WEEK:
+                    break
+                if (hall_id, slot) in hall_busy or (coach_id, slot) in coach_busy:
+                    continue
+                hall_busy.add((hall_id, slot))
+                coach_busy.add((coach_id, slot))
+                template.append((group_id, *slot))
+                placed += 1
+        return template
+
+    def trainings(self) -> Iterator[Tuple[int, datetime, datetime, int]]:
+        """
+        Разворачивает недельный шаблон на заданное число недель.
+        Выдает (training_id, start_time, end_time, group_id) без накопления в памяти.
+        """
+        training_id = 0
+        for week in range(self.weeks):
+            week_start = self.start_date + timedelta(weeks=week)
+            for group_id, weekday, hour in self.template_order():
+                day = week_start + timedelta(days=weekday)
+                start = datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc)
+                training_id += 1
+                yield training_id, start, start + TRAINING_DURATION, group_id
+
+    def template_order(self) -> List[Tuple[int, int, int]]:
+        return sorted(self.weekly_template, key=lambda item: (item[1], item[2], item[0]))
+
+    def full_name(self) -> str:
+        return f"{self.rng.choice(SURNAMES)} {self.rng.choice(FIRST_NAMES)}"
+
+
+async def copy_table(connection, table: str, columns: List[str], records) -> None:
+    await connection.copy_records_to_table(table, columns=columns, records=records)
+
+
+async def generate(scale: float = 1, seed: int = 42, weeks: int = 4, start_date: date | None = None) -> Dict[str, int]:
+    """
+    Заполняет пустую базу набором данных заданного масштаба.
+    Возвращает количество созданных записей по основным сущностям.
+    """
+    from app.coach.models import Coach
+
+    async with async_session_maker() as session:
+        if (await session.execute(select(Coach.id).limit(1))).first():
+            raise RuntimeError("База данных не пуста. Сначала очистите ее через /tests/clear.")
+
+    started = time.perf_counter()
+    dataset = Dataset(scale, seed, weeks, start_date or date.today())
+    password_hash = get_password_hash(DEFAULT_PASSWORD)
+    rng = dataset.rng
+
+    async with engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        connection = raw_connection.driver_connection
+
+        async with connection.transaction():
+            await copy_table(connection, "sport_types", ["id", "name", "description"], [
+                (i, name, description) for i, (name, description) in enumerate(SPORT_TYPES, start=1)
+            ])
+            await copy_table(connection, "halls", ["id", "name", "capacity"], [
+                (hall_id, f"Зал {hall_id}", rng.randint(30, 50)) for hall_id in dataset.hall_ids
+            ])
+            users_columns = ["id", "password_hash", "full_name", "phone_number", "email", "role", "admin"]
+            await copy_table(connection, "users", users_columns, (
+                (user_id, password_hash, dataset.full_name(), f"+7900{user_id:07d}", f"user.{user_id}@school.com",
+                 "coach" if user_id <= dataset.coaches_count else "athlete", False)
+                for user_id in dataset.coach_ids + dataset.athlete_ids
+            ))
+            await copy_table(connection, "coaches", ["id", "experience_years", "bio"], [
+                (coach_id, rng.randint(1, 30), "Тренер, сгенерированный для нагрузочного тестирования.")
+                for coach_id in dataset.coach_ids
+            ])
+            await copy_table(connection, "athletes", ["id"], [(athlete_id,) for athlete_id in dataset.athlete_ids])
+            await copy_table(connection, "coach_sport_types", ["coach_id", "sport_type_id"], [
+                (coach_id, (coach_id % len(SPORT_TYPES)) + 1) for coach_id in dataset.coach_ids
+            ])
+            await copy_table(connection, "groups", ["id", "name"], [
+                (group_id, f"Группа {group_id}") for group_id in dataset.group_ids
+            ])
+            await copy_table(connection, "group_coaches", ["group_id", "coach_id"], [
+                (group_id, coach_id) for group_id, coach_id in dataset.group_coach.items()
+            ])
+            await copy_table(connection, "group_athletes", ["group_id", "athlete_id"], (
+                (group_id, athlete_id)
+                for group_id, members in dataset.group_members.items()
+                for athlete_id in members
+            ))
+
+            is_group = {group_id: len(members) > 1 for group_id, members in dataset.group_members.items()}
+            await copy_table(connection, "trainings", ["id", "start_time", "end_time", "is_group_training"], (
+                (training_id, start, end, is_group[group_id])
+                for training_id, start, end, group_id in dataset.trainings()
+            ))
+            await copy_table(connection, "training_groups", ["training_id", "group_id"], (
+                (training_id, group_id) for training_id, _, _, group_id in dataset.trainings()
+            ))
+            await copy_table(connection, "training_halls", ["training_id", "hall_id", "during"], (
+                (training_id, dataset.group_hall[group_id], Range(start, end))
+                for training_id, start, end, group_id in dataset.trainings()
+            ))
+
+            # ID задавались явно — переводим счетчики identity-колонок за максимум
+            for table in ["users", "sport_types", "halls", "groups", "trainings"]:
+                await connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)"
+                )
+
+            for table in ["users", "trainings", "training_halls", "group_athletes", "training_groups"]:
+                await connection.execute(f"ANALYZE {table}")
+
+    stats = {
+        "athletes": dataset.athletes_count,
+        "coaches": dataset.coaches_count,
+        "groups": dataset.groups_count,
+        "halls": dataset.halls_count,
+        "trainings": len(dataset.weekly_template) * dataset.weeks,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    print(f"Сгенерировано: {stats}")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Генератор тестовых данных SPORT SCHOOL")
+    parser.add_argument("--scale", type=float, default=1, help="Коэффициент масштаба (1 = 1000 атлетов, 40 групп)")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора случайных чисел")
+    parser.add_argument("--weeks", type=int, default=4, help="Количество недель расписания")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None, help="Первая неделя расписания (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    asyncio.run(generate(scale=args.scale, seed=args.seed, weeks=args.weeks, start_date=args.start_date))
+
+
+if __name__ == "__main__":
+    main()
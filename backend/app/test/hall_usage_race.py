@@ -0,0 +1,143 @@
+"""
+Проверка агрегата hall_usage под конкурентной нагрузкой.
+
+В каждом раунде несколько групп с разными тренерами одновременно бронируют
+соседние непересекающиеся слоты одного зала, попадающие в одни и те же часовые
+корзины. Затем те же брони параллельно удаляются. Проверка падает, если
+какая-то запись завершилась внутренней ошибкой (например, 23505 по ключу
+hall_usage) или агрегат разошелся с пересчетом по training_halls.
+
+Запуск:
+    python -m app.test.hall_usage_race --generate --scale 1
+    python -m app.test.hall_usage_race --parallel 6 --rounds 20
+"""
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from typing import Dict, List
+
+from sqlalchemy import delete, func, select
+
+from app.database import async_session_maker, engine
+from app.test.booking_race import pick_targets
+
+# Длительность одного слота; слоты раунда идут подряд с середины часа
+SLOT_MINUTES = 20
+
+
+def expected_minutes(slots) -> Dict:
+    """Минуты по часовым корзинам для списка слотов (start, end)."""
+    minutes = {}
+    for start, end in slots:
+        bucket = start.replace(minute=0)
+        while bucket < end:
+            overlap = min(end, bucket + timedelta(hours=1)) - max(start, bucket)
+            minutes[bucket] = minutes.get(bucket, 0) + round(overlap.total_seconds() / 60)
+            bucket += timedelta(hours=1)
+    return minutes
+
+
+async def usage_minutes(hall_id: int, window_start, window_end) -> Dict:
+    from app.hall.models import HallUsage
+
+    async with async_session_maker() as session:
+        rows = (await session.execute(
+            select(HallUsage.bucket, HallUsage.minutes).where(
+                HallUsage.hall_id == hall_id,
+                HallUsage.bucket >= window_start,
+                HallUsage.bucket < window_end,
+            )
+        )).all()
+    return {row.bucket: row.minutes for row in rows}
+
+
+async def delete_training(training_id: int) -> None:
+    """Удаляет бронь зала тренировки в отдельной транзакции."""
+    from app.training_hall.models import TrainingHall
+
+    async with async_session_maker() as session:
+        await session.execute(delete(TrainingHall).where(TrainingHall.training_id == training_id))
+        await session.commit()
+
+
+async def run(generate_data: bool, scale: float, parallel: int, rounds: int) -> int:
+    from app.training.models import Training
+    from app.training_hall.models import TrainingHall
+    from app.group.models import training_groups
+
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=1)
+
+    hall_id, group_ids, latest = await pick_targets(parallel)
+    if len(group_ids) < 2 or latest is None:
+        print("Недостаточно данных: нужны тренировки и хотя бы две группы с разными тренерами")
+        return 1
+    print(f"Зал {hall_id}, групп в гонке: {len(group_ids)}, раундов: {rounds}")
+
+    failures: List[str] = []
+    slot_start = latest.replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    round_hours = 1 + (SLOT_MINUTES * len(group_ids)) // 60 + 1
+    for round_number in range(rounds):
+        window_start = slot_start + timedelta(hours=round_hours * round_number)
+        window_end = window_start + timedelta(hours=round_hours)
+        first = window_start + timedelta(minutes=30)
+        slots = [
+            (first + timedelta(minutes=SLOT_MINUTES * i), first + timedelta(minutes=SLOT_MINUTES * (i + 1)))
+            for i in range(len(group_ids))
+        ]
+        results = await asyncio.gather(*(
+            Training.create_training(start, end, group_id, hall_id)
+            for (start, end), group_id in zip(slots, group_ids)
+        ))
+        errors = {message for ok, message in results if not ok}
+        if errors:
+            failures.append(f"раунд {round_number + 1}: отказы при бронировании: {sorted(errors)}")
+
+        usage = await usage_minutes(hall_id, window_start, window_end)
+        expected = expected_minutes(slots)
+        if usage != expected:
+            failures.append(f"раунд {round_number + 1}: после бронирования {usage} вместо {expected}")
+
+        async with async_session_maker() as session:
+            created = (await session.execute(
+                select(TrainingHall.training_id).where(
+                    TrainingHall.hall_id == hall_id,
+                    TrainingHall.during.op("&&")(func.tstzrange(window_start, window_end, "[)")),
+                )
+            )).scalars().all()
+        await asyncio.gather(*(delete_training(training_id) for training_id in created))
+
+        leftover = await usage_minutes(hall_id, window_start, window_end)
+        if leftover:
+            failures.append(f"раунд {round_number + 1}: после удаления остались корзины {leftover}")
+        print(f"раунд {round_number + 1}: бронирований {len(created)}, корзин {len(usage)}")
+
+    # Удаляем тренировки, созданные проверкой
+    async with async_session_maker() as session:
+        created = select(Training.id).where(Training.start_time >= slot_start)
+        await session.execute(delete(TrainingHall).where(TrainingHall.training_id.in_(created)))
+        await session.execute(delete(training_groups).where(training_groups.c.training_id.in_(created)))
+        await session.execute(delete(Training).where(Training.start_time >= slot_start))
+        await session.commit()
+
+    await engine.dispose()
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Параллельные записи в один час зала и агрегат hall_usage")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=1, help="Масштаб генерируемых данных")
+    parser.add_argument("--parallel", type=int, default=6, help="Одновременных бронирований в раунде")
+    parser.add_argument("--rounds", type=int, default=20, help="Количество раундов")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.parallel, args.rounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Задержка несвязанных запросов во время волны логинов.
+
+Приложение вызывается в процессе через ASGI (весь стек middleware, без сети):
+параллельно с N одновременными POST /users/signin раз в --interval-ms
+отправляется GET /health/ready, который берет соединение из пула и выполняет
+SELECT 1, и считаются его p50/p99. Если argon2 выполняется в event loop,
+задержка растет на время хэширования; если ожидающие хэширования логины держат
+соединения, проба ждет пул и получает 503. Проверка падает, если p99 под
+нагрузкой больше бюджета, если проба хоть раз ответила не 200 или если логин
+завершился ошибкой 5xx, кроме 503 от переполненной очереди хэширования.
+
+Нужна база с пользователями генератора (пароль DEFAULT_PASSWORD).
+
+Запуск:
+    python -m app.test.login_load_bench --generate --scale 1
+    python -m app.test.login_load_bench --logins 200 --concurrency 50 --budget-ms 50
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from app.database import engine
+
+
+async def asgi_request(app, method: str, path: str, payload: dict = None) -> Tuple[int, float]:
+    """
+    Выполняет запрос к ASGI-приложению. Возвращает (статус, время в мс).
+    """
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+    finished = asyncio.Event()
+    status = 0
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            finished.set()
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return status, (time.perf_counter() - started) * 1000
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def probe_ready(app, stop: asyncio.Event, interval: float) -> Tuple[List[float], Dict[int, int]]:
+    """Опрашивает /health/ready до stop; возвращает время успешных ответов и число ответов по статусам."""
+    timings, statuses = [], {}
+    while not stop.is_set():
+        status, elapsed = await asgi_request(app, "GET", "/health/ready")
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            timings.append(elapsed)
+        await asyncio.sleep(interval)
+    return timings, statuses
+
+
+async def login_wave(app, emails: List[str], concurrency: int) -> List[Tuple[int, float]]:
+    from app.test.generator import DEFAULT_PASSWORD
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(email: str) -> Tuple[int, float]:
+        async with semaphore:
+            return await asgi_request(app, "POST", "/users/signin", {"email": email, "password": DEFAULT_PASSWORD})
+
+    return list(await asyncio.gather(*(login(email) for email in emails)))
+
+
+async def measure(app, emails: List[str], concurrency: int, interval: float, idle_seconds: float) -> dict:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_ready(app, stop, interval))
+    started = time.perf_counter()
+    if emails:
+        logins = await login_wave(app, emails, concurrency)
+    else:
+        await asyncio.sleep(idle_seconds)
+        logins = []
+    seconds = time.perf_counter() - started
+    stop.set()
+    timings, probe_statuses = await probe
+
+    statuses = {}
+    for status, _ in logins:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "seconds": round(seconds, 2),
+        "probes": len(timings),
+        "p50_ms": round(percentile(timings, 0.5), 2) if timings else None,
+        "p99_ms": round(percentile(timings, 0.99), 2) if timings else None,
+        "probe_statuses": probe_statuses,
+        "login_statuses": statuses,
+    }
+
+
+async def run(generate_data: bool, scale: float, logins: int, concurrency: int, interval_ms: float, budget_ms: float) -> int:
+    from sqlalchemy import select
+
+    from app.database import async_session_maker
+    from app.main import app
+    from app.user.models import User
+
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=1)
+
+    async with async_session_maker() as session:
+        emails = list((await session.execute(
+            select(User.email).where(User.email.like("user.%@school.com")).order_by(User.id).limit(logins)
+        )).scalars().all())
+    if not emails:
+        print("Нет пользователей генератора: запустите с --generate")
+        return 1
+
+    interval = interval_ms / 1000
+    await asgi_request(app, "GET", "/health/ready")  # Первый запрос собирает стек middleware и пул
+    idle = await measure(app, [], concurrency, interval, idle_seconds=2)
+    print(f"без нагрузки: {idle}")
+    loaded = await measure(app, emails, concurrency, interval, idle_seconds=0)
+    print(f"{len(emails)} логинов, одновременно {concurrency}: {loaded}")
+
+    await engine.dispose()
+    failures = []
+    if loaded["p99_ms"] is None or loaded["p99_ms"] > budget_ms:
+        failures.append(f"p99 /health/ready под нагрузкой {loaded['p99_ms']} мс больше бюджета {budget_ms:.0f} мс")
+    for phase in (idle, loaded):
+        failed_probes = {status: count for status, count in phase["probe_statuses"].items() if status != 200}
+        if failed_probes:
+            failures.append(f"/health/ready ответил не 200: {failed_probes}")
+    # 503 — штатный быстрый отказ переполненной очереди хэширования (run_password_hasher)
+    server_errors = {status: count for status, count in loaded["login_statuses"].items() if status >= 500 and status != 503}
+    if server_errors:
+        failures.append(f"ошибки сервера при логине: {server_errors}")
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Задержка /health/ready во время волны логинов")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=1, help="Масштаб генерируемых данных")
+    parser.add_argument("--logins", type=int, default=200, help="Количество логинов в волне")
+    parser.add_argument("--concurrency", type=int, default=50, help="Одновременных логинов")
+    parser.add_argument("--interval-ms", type=float, default=5, help="Интервал между запросами /health/ready")
+    parser.add_argument("--budget-ms", type=float, default=50, help="Бюджет на p99 /health/ready под нагрузкой")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.logins, args.concurrency, args.interval_ms, args.budget_ms)))
+
+
+if __name__ == "__main__":
+    main()
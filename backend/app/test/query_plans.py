@@ -0,0 +1,152 @@
+"""
+Проверка планов горячих запросов расписания.
+
+Для каждого запроса выполняется EXPLAIN (FORMAT JSON) на большом наборе данных
+(см. app/test/generator.py). Проверка падает, если:
+- в плане есть Seq Scan по одной из крупных таблиц;
+- оценка стоимости выросла относительно эталона больше допуска.
+
+Эталон в репозитории не хранится: оценки стоимости зависят от версии PostgreSQL,
+настроек планировщика и статистики конкретной базы. Его сохраняют локально
+(--update-baseline) на базе, сгенерированной с нужным масштабом, до изменения
+запросов или индексов и сравнивают после. Без эталона проверяется только
+отсутствие Seq Scan.
+
+Запуск:
+    python -m app.test.query_plans --generate --scale 10 --update-baseline
+    python -m app.test.query_plans
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.database import async_session_maker
+
+BASELINE_PATH = Path(__file__).with_name("query_plans_baseline.json")
+# Допустимый рост оценки стоимости относительно эталона
+COST_TOLERANCE = 0.2
+# Таблицы, полный просмотр которых на большом наборе считается регрессией
+LARGE_TABLES = {"trainings", "training_groups", "training_halls", "group_athletes", "group_coaches", "users", "hall_usage"}
+
+
+class Explain(Executable, ClauseElement):
+    """
+    Конструкция EXPLAIN (FORMAT JSON) <запрос> с сохранением параметров запроса.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def iter_plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+async def hot_queries(session) -> Dict[str, object]:
+    """
+    Собирает горячие запросы с параметрами, взятыми из текущих данных.
+    """
+    from app.coach.models import Coach
+    from app.hall.models import Hall
+    from app.training.models import Training
+    from app.group.models import group_athletes, group_coaches
+
+    athlete_id = (await session.execute(select(group_athletes.c.athlete_id).limit(1))).scalar_one()
+    coach_id, group_id = (await session.execute(
+        select(group_coaches.c.coach_id, group_coaches.c.group_id).limit(1)
+    )).one()
+    hall_id = (await session.execute(select(Hall.id).limit(1))).scalar_one()
+
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=7)
+    end = start + timedelta(minutes=90)
+
+    return {
+        "schedule_athlete": Training.schedule_query(athlete_id=athlete_id, start_from=start, limit=101),
+        "schedule_coach": Training.schedule_query(coach_id=coach_id, start_from=start, limit=101),
+        "booking": Training.booking_statement(start, end, group_id, hall_id),
+        "coach_directory": Coach.directory_query(limit=101),
+        "free_slots_busy": Training.busy_intervals_query(group_id, [hall_id], start, start + timedelta(days=7)),
+        "hall_utilization": Hall.utilization_query(start, start + timedelta(days=7), 8, 22, "UTC"),
+    }
+
+
+async def collect_plans() -> Dict[str, dict]:
+    plans = {}
+    async with async_session_maker() as session:
+        for name, statement in (await hot_queries(session)).items():
+            raw = (await session.execute(Explain(statement))).scalar_one()
+            plan = json.loads(raw) if isinstance(raw, str) else raw
+            plans[name] = plan[0]["Plan"]
+        await session.rollback()
+    return plans
+
+
+def check_plans(plans: Dict[str, dict], baseline: Dict[str, float]) -> List[str]:
+    failures = []
+    for name, plan in plans.items():
+        for node in iter_plan_nodes(plan):
+            if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+                failures.append(f"{name}: Seq Scan по таблице {node['Relation Name']}")
+
+        cost = plan["Total Cost"]
+        expected = baseline.get(name)
+        if expected is not None and cost > expected * (1 + COST_TOLERANCE):
+            failures.append(f"{name}: стоимость {cost:.1f} выше эталона {expected:.1f}")
+    return failures
+
+
+async def run(generate_data: bool, scale: float, update_baseline: bool) -> int:
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=26)
+
+    plans = await collect_plans()
+
+    if update_baseline:
+        BASELINE_PATH.write_text(json.dumps(
+            {name: plan["Total Cost"] for name, plan in plans.items()}, indent=2, ensure_ascii=False
+        ))
+        print(f"Эталон сохранен в {BASELINE_PATH}")
+
+    if BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text())
+    else:
+        baseline = {}
+        print(f"Эталон {BASELINE_PATH} не найден: сравнение стоимости пропущено (сохраните его через --update-baseline)")
+    failures = check_plans(plans, baseline)
+
+    for name, plan in plans.items():
+        print(f"{name}: {plan['Node Type']}, cost={plan['Total Cost']:.1f}")
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Проверка планов горячих запросов")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=10, help="Масштаб генерируемых данных")
+    parser.add_argument("--update-baseline", action="store_true", help="Сохранить текущие оценки стоимости как эталон")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.update_baseline)))
+
+
+if __name__ == "__main__":
+    main()
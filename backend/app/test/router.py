@@ -2,11 +2,13 @@ import random
 from datetime import datetime, timedelta, timezone 
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import Range
 from sqlalchemy.orm import selectinload
 
 from app.database import async_session_maker, Base
 from app.config import settings
 from app.utils import get_password_hash
+from app.test.generator import generate
 
 # Импортируем все необходимые модели
 from app.coach.models import Coach
@@ -90,6 +92,9 @@ async def seed_database():
 
         used_names = set()
 
+        # Хэш argon2 считается один раз и переиспользуется всеми тестовыми пользователями
+        default_password_hash = get_password_hash("password")
+
         # 4. Создание уникальных тренеров
         print("Создание уникальных тренеров...")
 
@@ -140,7 +145,7 @@ async def seed_database():
                 coach = Coach(
                     full_name=data["full_name"],
                     email=data["email"],
-                    password_hash=get_password_hash("password"),
+                    password_hash=default_password_hash,
                     phone_number=f"+7999{random.randint(1000000, 9999999)}",
                     experience_years=data["experience"],
                     bio=data["bio"]
@@ -185,12 +190,22 @@ async def seed_database():
         used_names.add(known_athlete_name) # Добавляем имя в список использованных
         print("Добавлен тестовый атлет для входа: email='test@test.com', password='string'")
 
+        # 5.1.1. Администратор (не тренер и не атлет) для создания расписания
+        session.add(User(
+            full_name="Администратор школы",
+            email="admin@test.com",
+            password_hash=known_athlete.password_hash,
+            phone_number="+79990001133",
+            admin=True,
+        ))
+        print("Добавлен администратор: email='admin@test.com', password='string'")
+
         # 5.2. Создаем остальных 29 случайных атлетов
         for _ in range(29):
             athletes.append(Athlete(
                 full_name=generate_full_name(used_names),
                 email=f"athlete.{len(used_names)}@school.com",
-                password_hash=get_password_hash("password"),
+                password_hash=default_password_hash,
                 phone_number=f"+7900{random.randint(1000000, 9999999)}",
             ))
         session.add_all(athletes)
@@ -220,9 +235,9 @@ async def seed_database():
             await session.flush() # Получаем ID группы
 
             hall = halls_map[group_def["hall_pref"]]
-            for j in range(5):
-                day = random.randint(1, 7)
-                hour = random.choice([9, 11, 14, 16, 18])
+            # Уникальные слоты: зал не может быть занят дважды в одно время
+            slots = random.sample([(day, hour) for day in range(1, 8) for hour in [9, 11, 14, 16, 18]], 5)
+            for j, (day, hour) in enumerate(slots):
                 
                 # ИЗМЕНЕНИЕ ЗДЕСЬ: Используем timezone.utc для создания "aware" datetime
                 start = datetime.now(timezone.utc).replace(hour=hour, minute=0, second=0, microsecond=0) + timedelta(days=day)
@@ -233,9 +248,11 @@ async def seed_database():
                     is_group_training=(j < 4) # 4 групповых, 1 индивидуальная
                 )
                 training.groups.append(group)
+                # Зал привязываем через связь, чтобы не делать flush ради ID тренировки
+                training.training_halls.append(TrainingHall(
+                    hall=hall, during=Range(training.start_time, training.end_time)
+                ))
                 session.add(training)
-                await session.flush() # Получаем ID тренировки
-                session.add(TrainingHall(training_id=training.id, hall_id=hall.id))
         
         print("Группы и тренировки созданы.")
         
@@ -245,6 +262,24 @@ async def seed_database():
     return {"message": "Полный набор тестовых данных успешно создан!"}
 
 
+@test_router.post("/generate", summary="Сгенерировать масштабируемый набор данных")
+async def generate_database(scale: float = 1, seed: int = 42, weeks: int = 4):
+    """
+    Заполняет пустую базу детерминированным набором данных для нагрузочного тестирования
+    (см. app/test/generator.py). scale=1 — 1000 атлетов, 50 тренеров, 40 групп, 10 залов.
+    Работает только если в .env файле DEBUG=True.
+    """
+    if not settings.DEBUG:
+        raise HTTPException(status_code=403, detail="Генерация данных разрешена только в режиме отладки.")
+
+    try:
+        stats = await generate(scale=scale, seed=seed, weeks=weeks)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"message": "Набор данных успешно сгенерирован!", "stats": stats}
+
+
 @test_router.post("/clear", summary="ПОЛНАЯ ОЧИСТКА ВСЕХ ДАННЫХ")
 async def clear_database():
     """
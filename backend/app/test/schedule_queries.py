@@ -0,0 +1,96 @@
+"""
+Проверка числа SQL-запросов при загрузке расписания.
+
+Расписание атлета, тренера и группы загружается для окон растущей длины
+(1, 4, 16 недель и т.д.). Проверка падает, если число запросов меняется
+вместе с числом тренировок (признак N+1) или превышает MAX_QUERIES.
+
+Запуск:
+    python -m app.test.schedule_queries --generate --scale 1 --weeks 16
+    python -m app.test.schedule_queries --windows 1 4 16
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+
+from app.database import async_session_maker, engine
+from app.test.counting import counted_scope
+
+# Расписание любого размера должно собираться одним запросом
+MAX_QUERIES = 1
+
+
+async def pick_subjects() -> Dict[str, dict]:
+    """
+    Атлет, тренер и группа из текущих данных.
+    """
+    from app.group.models import group_athletes, group_coaches
+
+    async with async_session_maker() as session:
+        athlete_id = (await session.execute(select(group_athletes.c.athlete_id).limit(1))).scalar_one()
+        coach_id, group_id = (await session.execute(
+            select(group_coaches.c.coach_id, group_coaches.c.group_id).limit(1)
+        )).one()
+    return {
+        "athlete": {"athlete_id": athlete_id},
+        "coach": {"coach_id": coach_id},
+        "group": {"group_id": group_id},
+    }
+
+
+async def measure(subject: dict, start: datetime, weeks: int) -> Tuple[int, int]:
+    """
+    Возвращает (число тренировок, число SQL-запросов) для окна в weeks недель.
+    """
+    from app.training.models import Training
+
+    async with counted_scope() as scope:
+        items, _ = await Training.load_schedule_page(
+            **subject, start_from=start, start_to=start + timedelta(weeks=weeks)
+        )
+        return len(items), scope.queries
+
+
+async def run(generate_data: bool, scale: float, weeks: int, windows: List[int]) -> int:
+    if generate_data:
+        from app.test.generator import generate
+        await generate(scale=scale, weeks=weeks)
+
+    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    failures = []
+    for name, subject in (await pick_subjects()).items():
+        results = [(window, *await measure(subject, start, window)) for window in windows]
+        for window, trainings, queries in results:
+            print(f"{name}: окно {window} нед., тренировок: {trainings}, запросов: {queries}")
+
+        counts = {queries for _, _, queries in results}
+        if len(counts) > 1:
+            failures.append(f"{name}: число запросов зависит от числа тренировок: {sorted(counts)}")
+        if max(counts) > MAX_QUERIES:
+            failures.append(f"{name}: {max(counts)} запросов, допустимо не больше {MAX_QUERIES}")
+        if len({trainings for _, trainings, _ in results}) == 1:
+            print(f"ПРЕДУПРЕЖДЕНИЕ: {name}: число тренировок не растет с окном, сгенерируйте больше недель")
+
+    await engine.dispose()
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Проверка числа SQL-запросов расписания")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=1, help="Масштаб генерируемых данных")
+    parser.add_argument("--weeks", type=int, default=16, help="Сколько недель тренировок генерировать")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 4, 16], help="Длины окон расписания, недели")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.weeks, args.windows)))
+
+
+if __name__ == "__main__":
+    main()
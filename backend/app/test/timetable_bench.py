@@ -0,0 +1,70 @@
+"""
+Замер построения недельного расписания (app/training/timetable.py) на наборе,
+сгенерированном в памяти тем же генератором, что и нагрузочная база.
+База данных не нужна.
+
+Запуск:
+    python -m app.test.timetable_bench --scale 25 --seed 42 --budget 10
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta, timezone
+
+from app.test.generator import Dataset, SESSIONS_PER_WEEK, TRAINING_DURATION
+from app.training.timetable import GroupDemand, build_timetable, week_slots
+
+OPEN_HOUR = 8
+CLOSE_HOUR = 22
+
+
+def run(scale: float, seed: int, budget: float) -> dict:
+    dataset = Dataset(scale, seed, weeks=1, start_date=date.today())
+    rng = random.Random(seed)
+    hall_capacity = {hall_id: rng.randint(30, 50) for hall_id in dataset.hall_ids}
+    groups = [
+        GroupDemand(
+            group_id=group_id,
+            sessions=SESSIONS_PER_WEEK,
+            members=len(dataset.group_members[group_id]),
+            coach_ids=[dataset.group_coach[group_id]],
+            preferred_hall_id=dataset.group_hall[group_id],
+        )
+        for group_id in dataset.group_ids
+    ]
+    slots = week_slots(dataset.start_date + timedelta(weeks=1), TRAINING_DURATION, OPEN_HOUR, CLOSE_HOUR, timezone.utc)
+
+    started = time.perf_counter()
+    result = build_timetable(slots, groups, hall_capacity, time_budget=budget)
+    seconds = time.perf_counter() - started
+
+    requested = sum(group.sessions for group in groups)
+    preferred = sum(
+        1 for placement in result.placements
+        if placement.hall_id == dataset.group_hall[placement.group_id]
+    )
+    return {
+        "groups": len(groups),
+        "halls": len(hall_capacity),
+        "slots": len(slots),
+        "sessions": requested,
+        "placed": len(result.placements),
+        "unplaced": sum(result.unplaced.values()),
+        "preferred_hall": preferred,
+        "timed_out": result.timed_out,
+        "seconds": round(seconds, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер построения недельного расписания")
+    parser.add_argument("--scale", type=float, default=25, help="Масштаб набора (25 = 1000 групп)")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора случайных чисел")
+    parser.add_argument("--budget", type=float, default=10, help="Бюджет времени, секунды")
+    args = parser.parse_args()
+
+    print(run(args.scale, args.seed, args.budget))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Замер отчета о загрузке залов (Hall.get_utilization) на годе данных.
+
+Нужна база с данными генератора (см. app/test/generator.py); агрегат hall_usage
+заполняется триггерами прямо во время генерации. Проверка падает, если
+95-й перцентиль времени ответа больше бюджета.
+
+Запуск:
+    python -m app.test.utilization_bench --generate --scale 10 --weeks 52
+    python -m app.test.utilization_bench --runs 200 --budget-ms 100
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app.database import async_session_maker, engine
+
+
+def percentile(values, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def run(generate_data: bool, scale: float, weeks: int, runs: int, budget_ms: float, seed: int) -> int:
+    from app.hall.models import Hall, HallUsage
+
+    if generate_data:
+        from app.test.generator import generate
+
+        started = time.perf_counter()
+        await generate(scale=scale, weeks=weeks)
+        print(f"Данные сгенерированы за {time.perf_counter() - started:.1f} с")
+
+    async with async_session_maker() as session:
+        first, last, buckets = (await session.execute(
+            select(func.min(HallUsage.bucket), func.max(HallUsage.bucket), func.count())
+        )).one()
+        hall_ids = list((await session.execute(select(Hall.id))).scalars().all())
+    if not buckets:
+        print("Таблица hall_usage пуста: сгенерируйте данные (--generate) или выполните python -m app.migrate")
+        return 1
+
+    first_day, last_day = first.date(), last.date()
+    span_weeks = max(1, (last_day - first_day).days // 7)
+    print(f"hall_usage: {buckets} строк, {first_day} — {last_day}, залов: {len(hall_ids)}")
+
+    rng = random.Random(seed)
+    scenarios = {
+        "неделя, все залы": lambda: (first_day + timedelta(weeks=rng.randrange(span_weeks)), 1, None),
+        "неделя, один зал": lambda: (first_day + timedelta(weeks=rng.randrange(span_weeks)), 1, rng.choice(hall_ids)),
+        "весь период, все залы": lambda: (first_day, min(span_weeks, 53), None),
+    }
+
+    failed = False
+    for name, make_args in scenarios.items():
+        await Hall.get_utilization(*make_args())  # Прогрев пула соединений и кэша планов
+        timings = []
+        for _ in range(runs):
+            week_start, window_weeks, hall_id = make_args()
+            started = time.perf_counter()
+            await Hall.get_utilization(week_start, window_weeks, hall_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        p50, p95 = percentile(timings, 0.5), percentile(timings, 0.95)
+        print(f"{name}: p50={p50:.1f} мс, p95={p95:.1f} мс, max={max(timings):.1f} мс")
+        if p95 > budget_ms:
+            print(f"ОШИБКА: {name}: p95 {p95:.1f} мс больше бюджета {budget_ms:.0f} мс")
+            failed = True
+
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер отчета о загрузке залов")
+    parser.add_argument("--generate", action="store_true", help="Сначала сгенерировать данные (база должна быть пустой)")
+    parser.add_argument("--scale", type=float, default=10, help="Масштаб генерируемых данных")
+    parser.add_argument("--weeks", type=int, default=52, help="Сколько недель тренировок генерировать")
+    parser.add_argument("--runs", type=int, default=200, help="Число запросов в каждом сценарии")
+    parser.add_argument("--budget-ms", type=float, default=100, help="Бюджет на p95, миллисекунды")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно выбора недель и залов")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.generate, args.scale, args.weeks, args.runs, args.budget_ms, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,28 @@
-from sqlalchemy import Column, Integer, DateTime, Boolean, JSON, select
+import asyncio
+from sqlalchemy import Column, Integer, DateTime, Boolean, JSON, select, func, insert, literal, exists, values, column, or_, tuple_, true
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
-from app.database import Base, async_session_maker
-from sqlalchemy import Identity
-from typing import List
+from app.database import Base, session_scope
+from sqlalchemy import Identity, Index
+from typing import List, Optional
 from typing import Tuple
-from datetime import datetime as dt
+from datetime import datetime as dt, date, time, timedelta, timezone
 from app.training_hall.models import TrainingHall
+from app.pagination import encode_cursor, decode_cursor
+
+# Коды ошибок PostgreSQL, которые означают конфликт бронирования
+EXCLUSION_VIOLATION = "23P01"
+FOREIGN_KEY_VIOLATION = "23503"
 
 class Training(Base):
     __tablename__ = "trainings"
+    __table_args__ = (
+        # Окно расписания и пагинация по ключу (start_time, id)
+        Index("ix_trainings_start_time_id", "start_time", "id"),
+        # Проверка пересечений: start_time < :end AND end_time > :start
+        Index("ix_trainings_end_time", "end_time"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
     start_time: Mapped[DateTime] = mapped_column(DateTime(timezone=True))
@@ -30,46 +44,202 @@ class Training(Base):
         pass
 
     @staticmethod
-    async def get_upcoming(group_id: int) -> List[dict]:
+    def schedule_query(
+        athlete_id: Optional[int] = None,
+        coach_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+        start_from: Optional[dt] = None,
+        start_to: Optional[dt] = None,
+        is_group: Optional[bool] = None,
+        after: Optional[Tuple[dt, int]] = None,
+        limit: Optional[int] = None,
+        hall_id: Optional[int] = None,
+    ):
         """
-        Получает все предстоящие тренировки для указанной группы.
-        НЕ ДОБАВЛЯЕТ ИМЯ ТРЕНЕРА.
+        Строит единый запрос расписания: тренировки вместе с залом, тренером,
+        видом спорта и числом участников группы.
+        Все данные собираются коррелированными подзапросами, поэтому
+        количество запросов не зависит от числа тренировок.
+        Группы фильтруются через IN, без JOIN: тренировка нескольких групп
+        дает одну строку, и ключ пагинации (start_time, id) остается уникальным.
+
+        Окно [start_from, start_to) и тип тренировки фильтруются в SQL,
+        пагинация — по ключу (start_time, id) > after.
         """
         # Локальные импорты для избежания циклических зависимостей
-        from app.group.models import Group, training_groups
+        from app.group.models import Group, training_groups, group_athletes, group_coaches
         from app.hall.models import Hall
         from app.specialization.models import SportType
+        from app.specialization.coach_sport_type import CoachSportType
+        from app.user.models import User
+
+        # Группы тренировки: подзапросы соединяются с training_groups и коррелируют по Training.id
+        of_training = training_groups.c.training_id == Training.id
+
+        if coach_id is not None:
+            # В расписании тренера всегда указывается он сам
+            coach_name = select(User.full_name).where(User.id == coach_id).scalar_subquery()
+        else:
+            coach_name = (
+                select(func.min(User.full_name))
+                .join(group_coaches, group_coaches.c.coach_id == User.id)
+                .join(training_groups, training_groups.c.group_id == group_coaches.c.group_id)
+                .where(of_training)
+                .scalar_subquery()
+            )
+
+        sport_type = (
+            select(func.min(SportType.name))
+            .join(CoachSportType, CoachSportType.sport_type_id == SportType.id)
+            .join(group_coaches, group_coaches.c.coach_id == CoachSportType.coach_id)
+            .join(training_groups, training_groups.c.group_id == group_coaches.c.group_id)
+            .where(of_training)
+            .scalar_subquery()
+        )
+
+        # Счетчик участников поддерживается триггером — строки group_athletes не читаются.
+        # Для тренировки нескольких групп участники суммируются
+        participants = func.coalesce(
+            select(func.sum(Group.member_count))
+            .join(training_groups, training_groups.c.group_id == Group.id)
+            .where(of_training)
+            .scalar_subquery(),
+            0,
+        )
+
+        hall_name = (
+            select(Hall.name)
+            .join(TrainingHall, TrainingHall.hall_id == Hall.id)
+            .where(TrainingHall.training_id == Training.id)
+            .limit(1)
+            .scalar_subquery()
+        )
 
-        async with async_session_maker() as session:
-            # 1. Получаем все объекты тренировок для данной группы
-            trainings_query = select(Training).join(training_groups).where(training_groups.c.group_id == group_id)
-            trainings_result = await session.execute(trainings_query)
-            trainings = trainings_result.scalars().all()
-
-            if not trainings:
-                return []
-
-            # 2. Получаем общую информацию о группе ОДИН РАЗ
-            group_members = await Group.get_members(group_id)
-            group_specializations = await SportType.get_sport_type_group(group_id)
-            
-            # 3. Формируем список тренировок, обогащая каждую данными
-            schedule_list = []
-            for training in trainings:
-                hall_name = await Hall.get_hall(training.id)
-                title = f"Тренировка по {group_specializations[0]}" if group_specializations else "Групповая тренировка"
-
-                schedule_list.append({
-                    "id": training.id,
-                    "type": 'group' if training.is_group_training else 'individual',
-                    "title": title,
-                    "time": training.start_time.strftime("%H:%M"),
-                    "location": hall_name or "Зал не указан",
-                    "date": training.start_time.strftime("%Y-%m-%d"),
-                    "participants": len(group_members)
-                })
-        
-            return schedule_list
+        query = (
+            select(
+                Training.id,
+                Training.start_time,
+                Training.end_time,
+                Training.is_group_training,
+                coach_name.label("coach"),
+                sport_type.label("sport_type"),
+                participants.label("participants"),
+                hall_name.label("location"),
+            )
+            .order_by(Training.start_time, Training.id)
+        )
+
+        def with_groups(groups):
+            return Training.id.in_(
+                select(training_groups.c.training_id).where(training_groups.c.group_id.in_(groups))
+            )
+
+        if athlete_id is not None:
+            query = query.where(
+                with_groups(select(group_athletes.c.group_id).where(group_athletes.c.athlete_id == athlete_id))
+            )
+        if coach_id is not None:
+            query = query.where(
+                with_groups(select(group_coaches.c.group_id).where(group_coaches.c.coach_id == coach_id))
+            )
+        if group_id is not None:
+            query = query.where(
+                Training.id.in_(select(training_groups.c.training_id).where(training_groups.c.group_id == group_id))
+            )
+        if hall_id is not None:
+            query = query.where(
+                Training.id.in_(select(TrainingHall.training_id).where(TrainingHall.hall_id == hall_id))
+            )
+        if start_from is not None:
+            query = query.where(Training.start_time >= start_from)
+        if start_to is not None:
+            query = query.where(Training.start_time < start_to)
+        if is_group is not None:
+            query = query.where(Training.is_group_training.is_(is_group))
+        if after is not None:
+            query = query.where(tuple_(Training.start_time, Training.id) > tuple_(*after))
+        if limit is not None:
+            query = query.limit(limit)
+
+        return query
+
+    @staticmethod
+    def schedule_row_to_dict(row) -> dict:
+        """
+        Преобразует строку запроса расписания в словарь формата TrainingSchema.
+        """
+        title = f"Тренировка по {row.sport_type}" if row.sport_type else "Групповая тренировка"
+        return {
+            "id": row.id,
+            "type": 'group' if row.is_group_training else 'individual',
+            "title": title,
+            "time": row.start_time.strftime("%H:%M"),
+            "location": row.location or "Неизвестно",
+            "date": row.start_time.strftime("%Y-%m-%d"),
+            "coach": row.coach or "Тренер не назначен",
+            "participants": row.participants,
+        }
+
+    @staticmethod
+    async def load_schedule(
+        athlete_id: Optional[int] = None,
+        coach_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+        start_from: Optional[dt] = None,
+    ) -> List[dict]:
+        """
+        Загружает предстоящее расписание атлета, тренера или группы одним запросом.
+        Без start_from возвращаются тренировки, начинающиеся с текущего момента.
+        """
+        items, _ = await Training.load_schedule_page(
+            athlete_id=athlete_id, coach_id=coach_id, group_id=group_id, start_from=start_from
+        )
+        return items
+
+    @staticmethod
+    async def load_schedule_page(
+        athlete_id: Optional[int] = None,
+        coach_id: Optional[int] = None,
+        group_id: Optional[int] = None,
+        start_from: Optional[dt] = None,
+        start_to: Optional[dt] = None,
+        is_group: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Загружает страницу расписания. Возвращает (тренировки, курсор следующей страницы).
+        Курсор равен None, если страница последняя.
+        """
+        after = tuple(decode_cursor(cursor, dt.fromisoformat, int)) if cursor else None
+
+        query = Training.schedule_query(
+            athlete_id=athlete_id,
+            coach_id=coach_id,
+            group_id=group_id,
+            start_from=start_from or dt.now(timezone.utc),
+            start_to=start_to,
+            is_group=is_group,
+            after=after,
+            # Запрашиваем на одну запись больше, чтобы понять, есть ли следующая страница
+            limit=limit + 1 if limit is not None else None,
+        )
+        async with session_scope() as session:
+            rows = (await session.execute(query)).all()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1].start_time.isoformat(), rows[-1].id])
+
+        return [Training.schedule_row_to_dict(row) for row in rows], next_cursor
+
+    @staticmethod
+    async def get_upcoming(group_id: int) -> List[dict]:
+        """
+        Получает все предстоящие тренировки для указанной группы.
+        """
+        return await Training.load_schedule(group_id=group_id)
 
     @staticmethod
     def get_all_trainings() -> List['Training']:
@@ -87,6 +257,87 @@ class Training(Base):
     def is_completed(training_id: int) -> bool:
         pass
 
+    @staticmethod
+    def booking_statement(start_time: dt, end_time: dt, group_id: int, hall_id: int):
+        """
+        Строит единый SQL-запрос бронирования: вставка тренировки, связи с группой
+        и занятости зала в одном выражении (data-modifying CTE).
+
+        - CTE checks один раз вычисляет занятость тренера, размер группы
+          (groups.member_count) и вместимость зала; тренировка вставляется,
+          только если тренер свободен и группа помещается в зал.
+        - Занятость зала гарантирует ограничение-исключение training_halls_no_overlap,
+          поэтому конкурентные запросы не могут забронировать один и тот же слот.
+        - Запрос всегда возвращает одну строку: id новой тренировки (NULL, если
+          вставки не было) и результаты проверок, чтобы объяснить отказ.
+        """
+        from app.group.models import Group, training_groups, group_coaches
+        from app.hall.models import Hall
+        from app.training_hall.models import TrainingHall
+
+        start = literal(start_time, DateTime(timezone=True))
+        end = literal(end_time, DateTime(timezone=True))
+
+        group_coach_ids = select(group_coaches.c.coach_id).where(group_coaches.c.group_id == group_id)
+        other_coaches = group_coaches.alias("other_coaches")
+        other_groups = training_groups.alias("other_groups")
+        coach_busy = exists(
+            select(Training.id)
+            .join(other_groups, other_groups.c.training_id == Training.id)
+            .join(other_coaches, other_coaches.c.group_id == other_groups.c.group_id)
+            .where(
+                other_coaches.c.coach_id.in_(group_coach_ids),
+                Training.start_time < end,
+                Training.end_time > start,
+            )
+        )
+        checks = select(
+            coach_busy.label("coach_busy"),
+            func.coalesce(
+                select(Group.member_count).where(Group.id == group_id).scalar_subquery(), 0
+            ).label("members"),
+            select(Hall.capacity).where(Hall.id == hall_id).scalar_subquery().label("capacity"),
+        ).cte("checks")
+
+        new_training = (
+            insert(Training)
+            .from_select(
+                ["start_time", "end_time", "is_group_training"],
+                select(start, end, checks.c.members > 1).where(
+                    ~checks.c.coach_busy,
+                    checks.c.members <= checks.c.capacity,
+                ),
+            )
+            .returning(Training.id, Training.is_group_training)
+            .cte("new_training")
+        )
+        linked_group = (
+            insert(training_groups)
+            .from_select(["training_id", "group_id"], select(new_training.c.id, literal(group_id)))
+            .cte("linked_group")
+        )
+        linked_hall = (
+            insert(TrainingHall)
+            .from_select(
+                ["training_id", "hall_id", "during"],
+                select(new_training.c.id, literal(hall_id), func.tstzrange(start, end, "[)")),
+            )
+            .cte("linked_hall")
+        )
+
+        return (
+            select(
+                new_training.c.id,
+                new_training.c.is_group_training,
+                checks.c.coach_busy,
+                checks.c.members,
+                checks.c.capacity,
+            )
+            .select_from(checks.outerjoin(new_training, true()))
+            .add_cte(linked_group)
+            .add_cte(linked_hall)
+        )
+
     @staticmethod
     async def create_training(
         start_time: dt, 
@@ -95,56 +346,495 @@ class Training(Base):
         hall_id: int
     ) -> Tuple[bool, str]: # <- ИЗМЕНЯЕМ ВОЗВРАЩАЕМЫЙ ТИП
         """
-        Создает новую тренировку с проверкой доступности зала и тренера.
-        Возвращает кортеж (успех: bool, сообщение: str).
+        Создает новую тренировку с проверкой доступности зала, тренера
+        и вместимости зала. Все проверки и вставка выполняются одним запросом
+        (см. booking_statement). Возвращает кортеж (успех: bool, сообщение: str).
+        """
+        async with session_scope() as session:
+            try:
+                result = await session.execute(
+                    Training.booking_statement(start_time, end_time, group_id, hall_id)
+                )
+                created = result.one()
+                await session.commit()
+
+            except IntegrityError as e:
+                await session.rollback()
+                sqlstate = getattr(e.orig, "sqlstate", None)
+                if sqlstate == EXCLUSION_VIOLATION:
+                    return (False, f"Зал с ID={hall_id} уже занят в это время.")
+                if sqlstate == FOREIGN_KEY_VIOLATION:
+                    return (False, f"Группа с id={group_id} или Зал с id={hall_id} не найдены.")
+                print(f"Ошибка при создании тренировки: {e}")
+                return (False, f"Внутренняя ошибка сервера: {e}")
+
+            except Exception as e:
+                await session.rollback()
+                print(f"Ошибка при создании тренировки: {e}")
+                return (False, f"Внутренняя ошибка сервера: {e}")
+
+        # Тренировка не вставлена — объясняем причину по результатам проверок
+        if created.id is None:
+            if created.capacity is None:
+                return (False, f"Зал с id={hall_id} не найден.")
+            if created.coach_busy:
+                return (False, f"Тренер группы с ID={group_id} уже занят в это время.")
+            return (False, f"Группа с ID={group_id} ({created.members} чел.) не помещается в зал с ID={hall_id} (вместимость {created.capacity}).")
+
+        is_group = created.is_group_training
+        message = f"Успешно создана {'групповая' if is_group else 'индивидуальная'} тренировка с ID={created.id}"
+        return (True, message)
+
+    @staticmethod
+    def expand_series(
+        start_date: date,
+        end_date: date,
+        weekdays: List[int],
+        start_time: time,
+        duration: timedelta,
+    ) -> List[Tuple[dt, dt]]:
+        """
+        Разворачивает правило повторения в список интервалов (начало, конец) в UTC.
+        Время без часового пояса — местное время школы (SCHOOL_TIMEZONE): смещение
+        берется для каждой даты отдельно, поэтому «вт/чт в 18:00» остается в 18:00
+        и после перехода на летнее/зимнее время.
+        """
+        from app.config import settings
+
+        tz = start_time.tzinfo or settings.school_tz
+        wall_time = start_time.replace(tzinfo=None)
+
+        occurrences = []
+        day = start_date
+        while day <= end_date:
+            if day.weekday() in weekdays:
+                start = dt.combine(day, wall_time, tzinfo=tz).astimezone(timezone.utc)
+                occurrences.append((start, start + duration))
+            day += timedelta(days=1)
+        return occurrences
+
+    @staticmethod
+    def series_conflicts_query(occurrences: List[Tuple[dt, dt]], group_id: int, hall_id: int):
+        """
+        Один запрос, который проверяет все вхождения серии сразу: кандидаты
+        передаются как VALUES и сопоставляются с занятостью зала и тренеров группы.
+        Возвращает только конфликтующие вхождения.
+        """
+        from app.group.models import training_groups, group_coaches
+        from app.training_hall.models import TrainingHall
+
+        candidates = values(
+            column("idx", Integer),
+            column("start_time", DateTime(timezone=True)),
+            column("end_time", DateTime(timezone=True)),
+            name="candidates",
+        ).data([(idx, start, end) for idx, (start, end) in enumerate(occurrences)])
+
+        hall_busy = exists(
+            select(TrainingHall.training_id).where(
+                TrainingHall.hall_id == hall_id,
+                TrainingHall.during.op("&&")(func.tstzrange(candidates.c.start_time, candidates.c.end_time, "[)")),
+            )
+        )
+
+        other_coaches = group_coaches.alias("other_coaches")
+        coach_busy = exists(
+            select(Training.id)
+            .join(training_groups, training_groups.c.training_id == Training.id)
+            .join(other_coaches, other_coaches.c.group_id == training_groups.c.group_id)
+            .where(
+                other_coaches.c.coach_id.in_(
+                    select(group_coaches.c.coach_id).where(group_coaches.c.group_id == group_id)
+                ),
+                Training.start_time < candidates.c.end_time,
+                Training.end_time > candidates.c.start_time,
+            )
+        )
+
+        return (
+            select(candidates.c.idx, hall_busy.label("hall_busy"), coach_busy.label("coach_busy"))
+            .select_from(candidates)
+            .where(or_(hall_busy, coach_busy))
+        )
+
+    @staticmethod
+    async def bulk_insert(session, trainings: List[dict]) -> List[int]:
+        """
+        Вставляет пачку тренировок вместе со связями training_groups и training_halls
+        тремя INSERT-запросами в текущей транзакции. Коммит остается за вызывающим кодом.
+
+        Каждый элемент: {"start_time", "end_time", "is_group_training", "group_id", "hall_id"}.
+        """
+        from app.group.models import training_groups
+        from app.training_hall.models import TrainingHall
+
+        if not trainings:
+            return []
+
+        result = await session.execute(
+            insert(Training).returning(Training.id, sort_by_parameter_order=True),
+            [
+                {
+                    "start_time": item["start_time"],
+                    "end_time": item["end_time"],
+                    "is_group_training": item["is_group_training"],
+                }
+                for item in trainings
+            ],
+        )
+        training_ids = list(result.scalars().all())
+
+        await session.execute(
+            insert(training_groups),
+            [
+                {"training_id": training_id, "group_id": item["group_id"]}
+                for training_id, item in zip(training_ids, trainings)
+            ],
+        )
+        await session.execute(
+            insert(TrainingHall),
+            [
+                {
+                    "training_id": training_id,
+                    "hall_id": item["hall_id"],
+                    "during": Range(item["start_time"], item["end_time"]),
+                }
+                for training_id, item in zip(training_ids, trainings)
+            ],
+        )
+        return training_ids
+
+    @staticmethod
+    async def create_series(
+        occurrences: List[Tuple[dt, dt]],
+        group_id: int,
+        hall_id: int,
+        skip_conflicts: bool = False,
+    ) -> Tuple[bool, dict]:
+        """
+        Создает серию тренировок одной транзакцией.
+        Конфликты со всеми существующими тренировками проверяются одним запросом.
+
+        В режиме skip_conflicts конфликтующие вхождения пропускаются,
+        иначе при любом конфликте не создается ни одна тренировка.
+        Возвращает кортеж (успех: bool, {"message", "training_ids", "conflicts"}).
         """
-        # Локальные импорты
         from app.group.models import Group
         from app.hall.models import Hall
-        from app.coach.models import Coach
-        from app.training_hall.models import TrainingHall
-        
-        async with async_session_maker() as session:
+
+        if not occurrences:
+            return (False, {"message": "Правило повторения не дает ни одной тренировки.", "training_ids": [], "conflicts": []})
+
+        async with session_scope() as session:
             try:
-                # --- ЭТАП ПРОВЕРОК ---
+                group_info = (await session.execute(
+                    select(
+                        func.coalesce(
+                            select(Group.member_count).where(Group.id == group_id).scalar_subquery(), 0
+                        ).label("members"),
+                        select(Hall.capacity).where(Hall.id == hall_id).scalar_subquery().label("capacity"),
+                    )
+                )).one()
 
-                # 1. Проверяем доступность зала
-                if not await Hall.is_available(hall_id, start_time, end_time):
-                    return (False, f"Зал с ID={hall_id} уже занят в это время.")
+                if group_info.capacity is None:
+                    return (False, {"message": f"Зал с id={hall_id} не найден.", "training_ids": [], "conflicts": []})
+                if group_info.members > group_info.capacity:
+                    return (False, {
+                        "message": f"Группа с ID={group_id} ({group_info.members} чел.) не помещается в зал с ID={hall_id} (вместимость {group_info.capacity}).",
+                        "training_ids": [],
+                        "conflicts": [],
+                    })
 
-                # 2. Получаем тренера группы для проверки его доступности
-                coach_id = await Coach.get_coach_id(group_id)
-                if coach_id:
-                    if not await Coach.is_available(coach_id, start_time, end_time):
-                        return (False, f"Тренер с ID={coach_id} уже занят в это время.")
-                
-                # --- ЭТАП СОЗДАНИЯ ---
+                conflict_rows = (await session.execute(
+                    Training.series_conflicts_query(occurrences, group_id, hall_id)
+                )).all()
+                conflicts = {
+                    row.idx: 'hall' if row.hall_busy else 'coach'
+                    for row in conflict_rows
+                }
+                conflict_list = [
+                    {"start_time": occurrences[idx][0], "end_time": occurrences[idx][1], "conflict": reason}
+                    for idx, reason in sorted(conflicts.items())
+                ]
 
-                group_query = select(Group).where(Group.id == group_id).options(selectinload(Group.athletes))
-                group = (await session.execute(group_query)).scalar_one_or_none()
-                hall = await session.get(Hall, hall_id)
+                if conflicts and not skip_conflicts:
+                    return (False, {
+                        "message": f"Конфликтов в серии: {len(conflicts)}. Ни одна тренировка не создана.",
+                        "training_ids": [],
+                        "conflicts": conflict_list,
+                    })
 
-                if not group or not hall:
-                    return (False, f"Группа с id={group_id} или Зал с id={hall_id} не найдены.")
-                
-                is_group = len(group.athletes) > 1
-                
-                new_training = Training(
-                    start_time=start_time, end_time=end_time, is_group_training=is_group
-                )
-                
-                new_training.groups.append(group)
-                session.add(new_training)
-                await session.flush()
-                
-                session.add(TrainingHall(training_id=new_training.id, hall_id=hall.id))
-                
+                is_group = group_info.members > 1
+                free = [
+                    occurrence for idx, occurrence in enumerate(occurrences)
+                    if idx not in conflicts
+                ]
+                training_ids = await Training.bulk_insert(session, [
+                    {
+                        "start_time": start,
+                        "end_time": end,
+                        "is_group_training": is_group,
+                        "group_id": group_id,
+                        "hall_id": hall_id,
+                    }
+                    for start, end in free
+                ])
                 await session.commit()
-                
-                message = f"Успешно создана {'групповая' if is_group else 'индивидуальная'} тренировка с ID={new_training.id}"
-                return (True, message)
 
-            except Exception as e:
+            except IntegrityError as e:
                 await session.rollback()
-                print(f"Ошибка при создании тренировки: {e}")
-                return (False, f"Внутренняя ошибка сервера: {e}")
+                sqlstate = getattr(e.orig, "sqlstate", None)
+                if sqlstate == EXCLUSION_VIOLATION:
+                    message = f"Зал с ID={hall_id} был занят параллельным запросом. Повторите попытку."
+                elif sqlstate == FOREIGN_KEY_VIOLATION:
+                    message = f"Группа с id={group_id} или Зал с id={hall_id} не найдены."
+                else:
+                    print(f"Ошибка при создании серии тренировок: {e}")
+                    message = f"Внутренняя ошибка сервера: {e}"
+                return (False, {"message": message, "training_ids": [], "conflicts": []})
+
+        return (True, {
+            "message": f"Создано тренировок: {len(training_ids)}, пропущено из-за конфликтов: {len(conflicts)}",
+            "training_ids": training_ids,
+            "conflicts": conflict_list,
+        })
+
+    @staticmethod
+    def busy_intervals_query(group_id: int, hall_ids: List[int], start_time: dt, end_time: dt):
+        """
+        Один запрос занятости для поиска слотов: интервалы указанных залов
+        (hall_id задан) и тренировки тренеров группы (hall_id = NULL) в окне.
+        """
+        from app.group.models import training_groups, group_coaches
+        from app.training_hall.models import TrainingHall
+
+        start = literal(start_time, DateTime(timezone=True))
+        end = literal(end_time, DateTime(timezone=True))
+
+        hall_busy = select(
+            TrainingHall.hall_id,
+            func.lower(TrainingHall.during).label("start_time"),
+            func.upper(TrainingHall.during).label("end_time"),
+        ).where(
+            TrainingHall.hall_id.in_(hall_ids),
+            TrainingHall.during.op("&&")(func.tstzrange(start, end, "[)")),
+        )
+
+        other_coaches = group_coaches.alias("other_coaches")
+        coach_busy = (
+            select(literal(None, Integer).label("hall_id"), Training.start_time, Training.end_time)
+            .join(training_groups, training_groups.c.training_id == Training.id)
+            .join(other_coaches, other_coaches.c.group_id == training_groups.c.group_id)
+            .where(
+                other_coaches.c.coach_id.in_(
+                    select(group_coaches.c.coach_id).where(group_coaches.c.group_id == group_id)
+                ),
+                Training.start_time < end,
+                Training.end_time > start,
+            )
+        )
+        return hall_busy.union_all(coach_busy)
+
+    @staticmethod
+    async def find_free_slots(
+        group_id: int,
+        duration: timedelta,
+        start_time: dt,
+        end_time: dt,
+        hall_ids: Optional[List[int]] = None,
+        step: timedelta = timedelta(minutes=30),
+        limit: int = 100,
+    ) -> Tuple[bool, List[dict] | str]:
+        """
+        Ищет свободные слоты (зал, начало) для тренировки группы заданной длительности.
+        Занятость залов и тренеров группы загружается одним запросом,
+        свободные окна считаются в памяти (см. app/training/slots.py).
+        Возвращает кортеж (успех: bool, список слотов или сообщение об ошибке).
+        """
+        from app.config import settings
+        from app.group.models import Group
+        from app.hall.models import Hall
+        from app.training.slots import find_slots
+
+        async with session_scope() as session:
+            group = await session.get(Group, group_id)
+            if group is None:
+                return (False, f"Группа с id={group_id} не найдена.")
+
+            # Только залы, в которые группа помещается
+            halls_query = select(Hall.id, Hall.name).where(Hall.capacity >= group.member_count).order_by(Hall.id)
+            if hall_ids:
+                halls_query = halls_query.where(Hall.id.in_(hall_ids))
+            halls = {row.id: row.name for row in (await session.execute(halls_query)).all()}
+            if not halls:
+                return (True, [])
+
+            busy_rows = (await session.execute(
+                Training.busy_intervals_query(group_id, list(halls), start_time, end_time)
+            )).all()
+
+        hall_busy = {hall_id: [] for hall_id in halls}
+        coach_busy = []
+        for row in busy_rows:
+            target = coach_busy if row.hall_id is None else hall_busy[row.hall_id]
+            target.append((row.start_time, row.end_time))
+
+        slots = find_slots(
+            hall_busy, coach_busy, start_time, end_time, duration, step,
+            settings.HALL_OPEN_HOUR, settings.HALL_CLOSE_HOUR, settings.school_tz, limit,
+        )
+        return (True, [
+            {"hall_id": hall_id, "hall_name": halls[hall_id], "start_time": start, "end_time": start + duration}
+            for hall_id, start in slots
+        ])
+
+    @staticmethod
+    def timetable_groups_query(week_start: dt, week_end: dt, group_ids: Optional[List[int]] = None):
+        """
+        Данные групп для составления расписания одним запросом: число участников,
+        тренеры, предпочитаемый зал (где группа занималась чаще всего)
+        и число тренировок, уже стоящих у группы на этой неделе.
+        """
+        from app.group.models import Group, training_groups, group_coaches
+        from app.training_hall.models import TrainingHall
+
+        coach_ids = func.array(
+            select(group_coaches.c.coach_id).where(group_coaches.c.group_id == Group.id).scalar_subquery()
+        )
+        preferred_hall = (
+            select(TrainingHall.hall_id)
+            .join(training_groups, training_groups.c.training_id == TrainingHall.training_id)
+            .where(training_groups.c.group_id == Group.id)
+            .group_by(TrainingHall.hall_id)
+            .order_by(func.count().desc(), TrainingHall.hall_id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        scheduled = (
+            select(func.count())
+            .select_from(training_groups)
+            .join(Training, Training.id == training_groups.c.training_id)
+            .where(
+                training_groups.c.group_id == Group.id,
+                Training.start_time >= week_start,
+                Training.start_time < week_end,
+            )
+            .scalar_subquery()
+        )
+        query = select(
+            Group.id,
+            Group.member_count.label("members"),
+            coach_ids.label("coach_ids"),
+            preferred_hall.label("preferred_hall_id"),
+            scheduled.label("scheduled"),
+        ).order_by(Group.id)
+        if group_ids:
+            query = query.where(Group.id.in_(group_ids))
+        return query
+
+    @staticmethod
+    def week_busy_query(week_start: dt, week_end: dt):
+        """
+        Вся занятость недели одним запросом: строки (hall_id, NULL, начало, конец)
+        для залов и (NULL, coach_id, начало, конец) для тренеров.
+        """
+        from app.group.models import training_groups, group_coaches
+        from app.training_hall.models import TrainingHall
+
+        start = literal(week_start, DateTime(timezone=True))
+        end = literal(week_end, DateTime(timezone=True))
+
+        hall_busy = select(
+            TrainingHall.hall_id,
+            literal(None, Integer).label("coach_id"),
+            func.lower(TrainingHall.during).label("start_time"),
+            func.upper(TrainingHall.during).label("end_time"),
+        ).where(TrainingHall.during.op("&&")(func.tstzrange(start, end, "[)")))
+
+        coach_busy = (
+            select(literal(None, Integer).label("hall_id"), group_coaches.c.coach_id, Training.start_time, Training.end_time)
+            .join(training_groups, training_groups.c.training_id == Training.id)
+            .join(group_coaches, group_coaches.c.group_id == training_groups.c.group_id)
+            .where(Training.start_time < end, Training.end_time > start)
+        )
+        return hall_busy.union_all(coach_busy)
+
+    @staticmethod
+    async def plan_timetable(
+        week_start: date,
+        sessions_per_week: int,
+        duration: timedelta,
+        group_ids: Optional[List[int]] = None,
+        time_budget: float = 5.0,
+        dry_run: bool = False,
+    ) -> Tuple[bool, dict]:
+        """
+        Составляет расписание недели для групп (см. app/training/timetable.py)
+        с учетом уже существующих тренировок и сохраняет его одной транзакцией.
+        Каждой группе добавляется столько занятий, сколько не хватает до sessions_per_week.
+        Возвращает кортеж (успех: bool, {"message", "training_ids", "entries", "unplaced"}).
+        """
+        from app.config import settings
+        from app.hall.models import Hall
+        from app.training.timetable import GroupDemand, build_timetable, busy_slot_pairs, week_slots
+
+        tz = settings.school_tz
+        slots = week_slots(week_start, duration, settings.HALL_OPEN_HOUR, settings.HALL_CLOSE_HOUR, tz)
+        if not slots:
+            return (False, {"message": "В часы работы залов не помещается ни одно занятие.", "training_ids": [], "entries": [], "unplaced": []})
+        week_from = dt.combine(week_start, time.min, tzinfo=tz)
+        week_to = dt.combine(week_start + timedelta(days=7), time.min, tzinfo=tz)
+
+        async with session_scope() as session:
+            group_rows = (await session.execute(
+                Training.timetable_groups_query(week_from, week_to, group_ids)
+            )).all()
+            hall_capacity = dict((await session.execute(select(Hall.id, Hall.capacity))).all())
+            busy_rows = (await session.execute(Training.week_busy_query(week_from, week_to))).all()
+
+        groups = [
+            GroupDemand(
+                group_id=row.id,
+                sessions=sessions_per_week - row.scheduled,
+                members=row.members,
+                coach_ids=list(row.coach_ids),
+                preferred_hall_id=row.preferred_hall_id,
+            )
+            for row in group_rows
+            if row.scheduled < sessions_per_week
+        ]
+        busy_halls = busy_slot_pairs(slots, [(row.hall_id, row.start_time, row.end_time) for row in busy_rows if row.hall_id is not None])
+        busy_coaches = busy_slot_pairs(slots, [(row.coach_id, row.start_time, row.end_time) for row in busy_rows if row.coach_id is not None])
+
+        # Поиск занимает до time_budget секунд процессорного времени — выполняем вне event loop
+        loop = asyncio.get_running_loop()
+        timetable = await loop.run_in_executor(
+            None, build_timetable, slots, groups, hall_capacity, busy_halls, busy_coaches, time_budget
+        )
+        entries = timetable.entries()
+        unplaced = [{"group_id": group_id, "missing": missing} for group_id, missing in sorted(timetable.unplaced.items())]
+        summary = f"Разложено занятий: {len(entries)}, не удалось разложить: {sum(timetable.unplaced.values())}"
+        if timetable.timed_out:
+            summary += " (исчерпан бюджет времени)"
+
+        if dry_run or not entries:
+            return (True, {"message": summary, "training_ids": [], "entries": entries, "unplaced": unplaced})
+
+        members = {group.group_id: group.members for group in groups}
+        async with session_scope() as session:
+            try:
+                training_ids = await Training.bulk_insert(session, [
+                    {**entry, "is_group_training": members[entry["group_id"]] > 1}
+                    for entry in entries
+                ])
+                await session.commit()
+            except IntegrityError as e:
+                await session.rollback()
+                if getattr(e.orig, "sqlstate", None) == EXCLUSION_VIOLATION:
+                    message = "Расписание изменилось во время расчета. Повторите попытку."
+                else:
+                    print(f"Ошибка при сохранении расписания: {e}")
+                    message = f"Внутренняя ошибка сервера: {e}"
+                return (False, {"message": message, "training_ids": [], "entries": entries, "unplaced": unplaced})
+
+        return (True, {"message": summary, "training_ids": training_ids, "entries": entries, "unplaced": unplaced})
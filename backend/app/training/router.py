@@ -1,37 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.database import async_session_maker
-from app.training.schemas import TrainingSchema, TrainingType, CreateTrainingRequest
+from app.training.schemas import TrainingSchema, TrainingType, CreateTrainingRequest, CreateSeriesRequest, SeriesMode, SeriesResponse, FreeSlotSchema, TimetableRequest, TimetableResponse
 from app.training.models import Training
-from app.middleware import get_current_user
+from app.middleware import get_current_user, require_roles
 from app.user.schemas import UserSchema
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 from app.hall.models import Hall
 from app.group.models import Group
+from app.pagination import NEXT_CURSOR_HEADER
+from app.cache import cached_response, window_now
+from app.training.slots import align_up
 
 training_router = APIRouter(prefix="/schedule", tags=["Расписание"])
 
+# Сущности, от которых зависит расписание: их запись сбрасывает кэш
+SCHEDULE_ENTITIES = ("trainings", "groups", "halls", "coaches")
+
 @training_router.get("/", response_model=List[TrainingSchema])
 async def get_schedule(
+    request: Request,
     type: Optional[TrainingType] = Query(None, description="Тип тренировки: 'individual' или 'group'"),
+    start_from: Optional[datetime] = Query(None, alias="from", description="Начало окна (ISO), по умолчанию — текущий момент"),
+    start_to: Optional[datetime] = Query(None, alias="to", description="Конец окна (ISO), не включительно"),
+    cursor: Optional[str] = Query(None, description=f"Курсор следующей страницы из заголовка {NEXT_CURSOR_HEADER}"),
+    limit: int = Query(100, ge=1, le=500, description="Количество тренировок на странице"),
     current_user: UserSchema = Depends(get_current_user),
 ):
-    # 1. Получаем полный список расписания, как и раньше
-    full_schedule = await Group.get_schedule(athlete_id=current_user.id)
+    """
+    Возвращает расписание текущего атлета в заданном окне времени.
+    Фильтр по типу и окно применяются в SQL; если есть следующая страница,
+    ее курсор передается в заголовке X-Next-Cursor.
+    """
+    # Окно «с текущего момента» фиксируется до сборки ключа кэша: иначе ответ
+    # и ETag не менялись бы, пока не изменятся данные
+    start_from = start_from or window_now()
+
+    async def build():
+        schedule, next_cursor = await Training.load_schedule_page(
+            athlete_id=current_user.id,
+            start_from=start_from,
+            start_to=start_to,
+            is_group=None if type is None else type == TrainingType.group,
+            cursor=cursor,
+            limit=limit,
+        )
+        content = [TrainingSchema.model_validate(training).model_dump(mode="json") for training in schedule]
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return JSONResponse(content=content, headers=headers)
 
-    # 2. Если query-параметр 'type' был передан, фильтруем результат уже в роутере
-    if type:
-        # type.value вернет строку 'individual' или 'group'
-        # Мы создаем новый список, включая только те словари, где поле 'type' совпадает
-        filtered_schedule = [
-            training for training in full_schedule if training.get("type") == type.value
-        ]
-        return filtered_schedule
+    key = ("schedule", current_user.id, type, start_from, start_to, cursor, limit)
+    return await cached_response(request, key, SCHEDULE_ENTITIES, build)
+
+# Максимальная длина окна поиска свободных слотов
+FREE_SLOTS_MAX_WINDOW = timedelta(days=31)
+
+@training_router.get("/free-slots", response_model=List[FreeSlotSchema], summary="Поиск свободных слотов")
+async def get_free_slots(
+    group_id: int = Query(..., description="ID группы, для которой ищется время"),
+    duration_minutes: int = Query(..., ge=1, le=24 * 60, description="Длительность тренировки"),
+    start_from: Optional[datetime] = Query(None, alias="from", description="Начало окна (ISO), по умолчанию — текущий момент"),
+    start_to: Optional[datetime] = Query(None, alias="to", description="Конец окна (ISO), по умолчанию — через 7 дней"),
+    hall_id: Optional[List[int]] = Query(None, description="Ограничить поиск залами (можно указать несколько)"),
+    step_minutes: int = Query(30, ge=5, le=24 * 60, description="Шаг сетки начала слотов"),
+    limit: int = Query(100, ge=1, le=1000, description="Максимальное количество слотов"),
+    current_user: UserSchema = Depends(require_roles("admin", "coach")),
+):
+    """
+    Возвращает свободные слоты (зал, начало), в которые тренировку группы
+    можно создать без конфликтов по залу и тренеру. Слоты упорядочены по времени.
+    Время без часового пояса считается UTC; часы работы залов — в часовом поясе школы (SCHOOL_TIMEZONE).
+    Без from окно начинается с ближайшего момента, кратного шагу сетки.
+    """
+    # Сетка слотов строится от начала окна: текущий момент выравнивается по шагу,
+    # иначе слоты начинались бы с произвольной секунды (14:07:33.412)
+    start_from = start_from or align_up(datetime.now(timezone.utc), timedelta(minutes=step_minutes))
+    if start_from.tzinfo is None:
+        start_from = start_from.replace(tzinfo=timezone.utc)
+    start_to = start_to or start_from + timedelta(days=7)
+    if start_to.tzinfo is None:
+        start_to = start_to.replace(tzinfo=timezone.utc)
+    if not start_from < start_to <= start_from + FREE_SLOTS_MAX_WINDOW:
+        raise HTTPException(status_code=400, detail="Окно поиска должно быть непустым и не длиннее 31 дня")
 
-    # 3. Если фильтр не был указан, возвращаем полный список
-    return full_schedule
+    success, result = await Training.find_free_slots(
+        group_id=group_id,
+        duration=timedelta(minutes=duration_minutes),
+        start_time=start_from,
+        end_time=start_to,
+        hall_ids=hall_id,
+        step=timedelta(minutes=step_minutes),
+        limit=limit,
+    )
+    if not success:
+        raise HTTPException(status_code=404, detail=result)
+    return result
 
 @training_router.post(
     "/", 
@@ -41,8 +108,7 @@ async def get_schedule(
 )
 async def create_training(
     training_data: CreateTrainingRequest,
-    # TODO: Добавить проверку, что пользователь является администратором или тренером
-    current_user: UserSchema = Depends(get_current_user) 
+    current_user: UserSchema = Depends(require_roles("admin", "coach"))
 ):
     """
     Создает новую тренировку с проверкой доступности зала и тренера.
@@ -69,4 +135,80 @@ async def create_training(
         )
     
     # В случае успеха возвращаем сообщение
-    return {"message": message}
\ No newline at end of file
+    return {"message": message}
+
+@training_router.post(
+    "/series",
+    summary="Создание серии повторяющихся тренировок",
+    status_code=status.HTTP_201_CREATED,
+    response_model=SeriesResponse,
+)
+async def create_training_series(
+    series_data: CreateSeriesRequest,
+    current_user: UserSchema = Depends(require_roles("admin", "coach"))
+):
+    """
+    Создает серию тренировок по правилу повторения (например, "каждый вт/чт в 18:00 на 16 недель").
+
+    - **start_date** / **end_date**: Период действия серии (включительно)
+    - **weekdays**: Дни недели, 0 — понедельник, 6 — воскресенье
+    - **start_time**: Время начала (например, "18:00:00" или "18:00:00+03:00"); без пояса — местное время школы
+    - **duration_minutes**: Длительность одной тренировки
+    - **mode**: `all_or_nothing` — при любом конфликте ничего не создается,
+      `skip_conflicts` — конфликтующие тренировки пропускаются
+    """
+    occurrences = Training.expand_series(
+        start_date=series_data.start_date,
+        end_date=series_data.end_date,
+        weekdays=series_data.weekdays,
+        start_time=series_data.start_time,
+        duration=timedelta(minutes=series_data.duration_minutes),
+    )
+
+    success, result = await Training.create_series(
+        occurrences=occurrences,
+        group_id=series_data.group_id,
+        hall_id=series_data.hall_id,
+        skip_conflicts=series_data.mode == SeriesMode.skip_conflicts,
+    )
+
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=jsonable_encoder(result)
+        )
+
+    return result
+
+@training_router.post(
+    "/timetable",
+    summary="Автоматическое составление расписания недели",
+    response_model=TimetableResponse,
+)
+async def create_timetable(
+    timetable_data: TimetableRequest,
+    current_user: UserSchema = Depends(require_roles("admin"))
+):
+    """
+    Раскладывает занятия групп по неделе без конфликтов по залам и тренерам
+    и сохраняет результат одной транзакцией.
+
+    - **week_start**: Понедельник планируемой недели
+    - **sessions_per_week**: Сколько занятий должно быть у каждой группы (уже существующие учитываются)
+    - **duration_minutes**: Длительность занятия; сетка слотов — в часы работы залов (в часовом поясе школы)
+    - **group_ids**: Группы для планирования, по умолчанию — все
+    - **time_budget_seconds**: Ограничение времени поиска
+    - **dry_run**: Только вернуть расписание, ничего не сохраняя
+    """
+    success, result = await Training.plan_timetable(
+        week_start=timetable_data.week_start,
+        sessions_per_week=timetable_data.sessions_per_week,
+        duration=timedelta(minutes=timetable_data.duration_minutes),
+        group_ids=timetable_data.group_ids,
+        time_budget=timetable_data.time_budget_seconds,
+        dry_run=timetable_data.dry_run,
+    )
+    if not success:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=jsonable_encoder(result))
+    return result
+
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from enum import Enum
-from datetime import date, datetime
+from datetime import date, datetime, time
+from typing import List, Optional
 
 class TrainingType(str, Enum):
     individual = "individual"
@@ -23,4 +24,101 @@ class CreateTrainingRequest(BaseModel):
     start_time: datetime
     end_time: datetime
     group_id: int
-    hall_id: int
\ No newline at end of file
+    hall_id: int
+
+class SeriesMode(str, Enum):
+    all_or_nothing = "all_or_nothing"
+    skip_conflicts = "skip_conflicts"
+
+class CreateSeriesRequest(BaseModel):
+    group_id: int
+    hall_id: int
+    start_date: date
+    end_date: date
+    weekdays: List[int]  # 0 — понедельник, 6 — воскресенье
+    start_time: time
+    duration_minutes: int
+    mode: SeriesMode = SeriesMode.all_or_nothing
+
+    @validator("weekdays")
+    def weekdays_range(cls, weekdays):
+        if not weekdays or any(day < 0 or day > 6 for day in weekdays):
+            raise ValueError("Weekdays must be a non-empty list of numbers from 0 to 6")
+        return sorted(set(weekdays))
+
+    @validator("duration_minutes")
+    def duration_range(cls, duration_minutes):
+        if duration_minutes <= 0 or duration_minutes > 24 * 60:
+            raise ValueError("Duration must be between 1 minute and 24 hours")
+        return duration_minutes
+
+    @validator("end_date")
+    def series_length(cls, end_date, values):
+        start_date = values.get("start_date")
+        if start_date and not (0 <= (end_date - start_date).days <= 366):
+            raise ValueError("Series must end after it starts and last at most one year")
+        return end_date
+
+class SeriesOccurrenceSchema(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    conflict: Optional[str] = None  # 'hall' или 'coach'
+
+class SeriesResponse(BaseModel):
+    message: str
+    training_ids: List[int]
+    conflicts: List[SeriesOccurrenceSchema]
+
+class TimetableRequest(BaseModel):
+    week_start: date  # понедельник планируемой недели
+    sessions_per_week: int = 3
+    duration_minutes: int = 90
+    group_ids: Optional[List[int]] = None  # по умолчанию — все группы
+    time_budget_seconds: float = 5
+    dry_run: bool = False  # только вернуть расписание, ничего не сохраняя
+
+    @validator("week_start")
+    def week_starts_on_monday(cls, week_start):
+        if week_start.weekday() != 0:
+            raise ValueError("Week must start on Monday")
+        return week_start
+
+    @validator("sessions_per_week")
+    def sessions_range(cls, sessions_per_week):
+        if not 1 <= sessions_per_week <= 7:
+            raise ValueError("Sessions per week must be between 1 and 7")
+        return sessions_per_week
+
+    @validator("duration_minutes")
+    def duration_range(cls, duration_minutes):
+        if not 15 <= duration_minutes <= 6 * 60:
+            raise ValueError("Duration must be between 15 minutes and 6 hours")
+        return duration_minutes
+
+    @validator("time_budget_seconds")
+    def budget_range(cls, time_budget_seconds):
+        if not 0 < time_budget_seconds <= 60:
+            raise ValueError("Time budget must be between 0 and 60 seconds")
+        return time_budget_seconds
+
+class TimetableEntrySchema(BaseModel):
+    group_id: int
+    hall_id: int
+    start_time: datetime
+    end_time: datetime
+
+class UnplacedGroupSchema(BaseModel):
+    group_id: int
+    missing: int
+
+class TimetableResponse(BaseModel):
+    message: str
+    training_ids: List[int]
+    entries: List[TimetableEntrySchema]
+    unplaced: List[UnplacedGroupSchema]
+
+class FreeSlotSchema(BaseModel):
+    hall_id: int
+    hall_name: str
+    start_time: datetime
+    end_time: datetime
@@ -0,0 +1,110 @@
+"""
+Поиск свободных слотов: занятые интервалы залов и тренера загружаются
+одним запросом (см. Training.busy_intervals_query), а свободные окна
+вычисляются в памяти проходом по отсортированным интервалам.
+"""
+import heapq
+from datetime import datetime as dt, timedelta, timezone, tzinfo
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+Interval = Tuple[dt, dt]
+
+
+def merge_intervals(intervals: Sequence[Interval]) -> List[Interval]:
+    """
+    Сортирует интервалы и склеивает пересекающиеся и смежные.
+    """
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def closed_hours(window_start: dt, window_end: dt, open_hour: int, close_hour: int, tz: tzinfo) -> List[Interval]:
+    """
+    Нерабочее время залов внутри окна в виде занятых интервалов
+    [закрытие дня, открытие следующего дня). Часы работы считаются в поясе tz.
+    """
+    day = window_start.astimezone(tz).date() - timedelta(days=1)
+    closed = []
+    while True:
+        midnight = dt.combine(day, dt.min.time(), tzinfo=tz)
+        closes = midnight + timedelta(hours=close_hour)
+        if closes >= window_end:
+            return closed
+        closed.append((closes, midnight + timedelta(days=1, hours=open_hour)))
+        day += timedelta(days=1)
+
+
+def align_up(moment: dt, step: timedelta) -> dt:
+    """
+    Ближайший момент не раньше moment, кратный step от начала эпохи (UTC):
+    при шаге 30 минут — :00 или :30. Для часовых поясов с целочасовым смещением
+    кратность сохраняется и в местном времени.
+    """
+    epoch = dt(1970, 1, 1, tzinfo=timezone.utc)
+    offset = (moment - epoch) % step
+    return moment if not offset else moment + (step - offset)
+
+
+def resource_slots(
+    busy: List[Interval],
+    window_start: dt,
+    window_end: dt,
+    duration: timedelta,
+    step: timedelta,
+) -> Iterator[dt]:
+    """
+    Проход по склеенным занятым интервалам: в каждом свободном промежутке
+    выдаются начала слотов на сетке window_start + k * step.
+    """
+    cursor = window_start
+    for busy_start, busy_end in busy + [(window_end, window_end)]:
+        gap_end = min(busy_start, window_end)
+        if cursor < gap_end:
+            # Первая точка сетки не раньше начала промежутка
+            offset = (cursor - window_start) % step
+            start = cursor if not offset else cursor + (step - offset)
+            while start + duration <= gap_end:
+                yield start
+                start += step
+        cursor = max(cursor, busy_end)
+        if cursor >= window_end:
+            return
+
+
+def find_slots(
+    hall_busy: Dict[int, List[Interval]],
+    coach_busy: List[Interval],
+    window_start: dt,
+    window_end: dt,
+    duration: timedelta,
+    step: timedelta,
+    open_hour: int,
+    close_hour: int,
+    tz: tzinfo,
+    limit: int,
+) -> List[Tuple[int, dt]]:
+    """
+    Возвращает до limit свободных слотов (hall_id, начало), упорядоченных
+    по времени начала, затем по залу. Слот свободен, если в нем не заняты
+    ни зал, ни тренер группы, и он целиком попадает в часы работы (в поясе tz).
+    """
+    common = coach_busy + closed_hours(window_start, window_end, open_hour, close_hour, tz)
+
+    def hall_stream(hall_id: int, intervals: List[Interval]) -> Iterator[Tuple[dt, int]]:
+        busy = merge_intervals(intervals + common)
+        for start in resource_slots(busy, window_start, window_end, duration, step):
+            yield start, hall_id
+
+    streams = [hall_stream(hall_id, intervals) for hall_id, intervals in hall_busy.items()]
+    slots = []
+    for start, hall_id in heapq.merge(*streams):
+        if len(slots) == limit:
+            break
+        slots.append((hall_id, start))
+    return slots
@@ -0,0 +1,283 @@
+"""
+Составление недельного расписания для групп без конфликтов по залам и тренерам.
+
+Неделя делится на сетку слотов одинаковой длительности. Группы раскладываются
+жадно, начиная с самых ограниченных (меньше подходящих залов, больше занятий,
+более загруженные тренеры). Для каждого занятия выбирается слот с наименьшим
+штрафом: день, в который у группы уже есть занятие, и зал не из предпочтений
+штрафуются. Если для занятия не нашлось места, выполняется откат на один шаг:
+одно мешающее занятие другой группы переносится в другой свободный слот.
+Работа ограничена бюджетом времени; не разложенные занятия возвращаются отдельно.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime as dt, timedelta, tzinfo
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class GroupDemand:
+    group_id: int
+    sessions: int
+    members: int
+    coach_ids: List[int]
+    preferred_hall_id: Optional[int] = None
+
+
+@dataclass
+class Placement:
+    group_id: int
+    hall_id: int
+    slot: int
+
+
+@dataclass
+class TimetableResult:
+    slots: List[Tuple[dt, dt]]
+    placements: List[Placement] = field(default_factory=list)
+    # group_id -> количество занятий, которые не удалось разложить
+    unplaced: Dict[int, int] = field(default_factory=dict)
+    timed_out: bool = False
+
+    def entries(self) -> List[dict]:
+        return [
+            {
+                "group_id": placement.group_id,
+                "hall_id": placement.hall_id,
+                "start_time": self.slots[placement.slot][0],
+                "end_time": self.slots[placement.slot][1],
+            }
+            for placement in sorted(self.placements, key=lambda item: (item.slot, item.hall_id))
+        ]
+
+
+def week_slots(week_start: date, duration: timedelta, open_hour: int, close_hour: int, tz: tzinfo) -> List[Tuple[dt, dt]]:
+    """
+    Сетка слотов недели в поясе tz: каждый день с open_hour, слоты идут подряд до close_hour.
+    """
+    slots = []
+    for day in range(7):
+        current = dt.combine(week_start + timedelta(days=day), dt.min.time(), tzinfo=tz)
+        start = current + timedelta(hours=open_hour)
+        closes = current + timedelta(hours=close_hour)
+        while start + duration <= closes:
+            slots.append((start, start + duration))
+            start += duration
+    return slots
+
+
+# Владелец занятого ресурса: индекс размещения или EXISTING для тренировок из базы
+EXISTING = -1
+# Сколько мешающих занятий пробовать перенести ради одного неразложенного
+MAX_REPAIR_ATTEMPTS = 64
+
+
+class TimetableBuilder:
+    def __init__(
+        self,
+        slots: List[Tuple[dt, dt]],
+        groups: List[GroupDemand],
+        hall_capacity: Dict[int, int],
+        busy_halls: Set[Tuple[int, int]] = frozenset(),
+        busy_coaches: Set[Tuple[int, int]] = frozenset(),
+    ):
+        self.slots = slots
+        self.days = [start.date() for start, _ in slots]
+        self.groups = {group.group_id: group for group in groups}
+
+        # Залы по возрастанию вместимости: маленькие группы не занимают большие залы
+        halls_by_capacity = sorted(hall_capacity, key=lambda hall_id: (hall_capacity[hall_id], hall_id))
+        self.eligible_halls: Dict[int, List[int]] = {}
+        for group in groups:
+            halls = [hall_id for hall_id in halls_by_capacity if hall_capacity[hall_id] >= group.members]
+            if group.preferred_hall_id in halls:
+                halls.remove(group.preferred_hall_id)
+                halls.insert(0, group.preferred_hall_id)
+            self.eligible_halls[group.group_id] = halls
+
+        self.hall_owner: Dict[Tuple[int, int], int] = {key: EXISTING for key in busy_halls}
+        self.coach_owner: Dict[Tuple[int, int], int] = {key: EXISTING for key in busy_coaches}
+        self.group_slots: Dict[int, Set[int]] = {group.group_id: set() for group in groups}
+        # Количество занятий в каждом слоте — для равномерного распределения по неделе
+        self.slot_load: List[int] = [0] * len(slots)
+        self.placements: List[Placement] = []
+
+    # --- Занятость ---
+
+    def is_free(self, group: GroupDemand, hall_id: int, slot: int, ignore: int = None) -> bool:
+        owner = self.hall_owner.get((hall_id, slot))
+        if owner is not None and owner != ignore:
+            return False
+        if slot in self.group_slots[group.group_id]:
+            placement = self.placements[ignore] if ignore is not None else None
+            if placement is None or placement.group_id != group.group_id or placement.slot != slot:
+                return False
+        for coach_id in group.coach_ids:
+            owner = self.coach_owner.get((coach_id, slot))
+            if owner is not None and owner != ignore:
+                return False
+        return True
+
+    def place(self, group: GroupDemand, hall_id: int, slot: int) -> int:
+        index = len(self.placements)
+        self.placements.append(Placement(group.group_id, hall_id, slot))
+        self._occupy(group, hall_id, slot, index)
+        return index
+
+    def _occupy(self, group: GroupDemand, hall_id: int, slot: int, index: int) -> None:
+        self.hall_owner[(hall_id, slot)] = index
+        for coach_id in group.coach_ids:
+            self.coach_owner[(coach_id, slot)] = index
+        self.group_slots[group.group_id].add(slot)
+        self.slot_load[slot] += 1
+
+    def _release(self, index: int) -> None:
+        placement = self.placements[index]
+        group = self.groups[placement.group_id]
+        del self.hall_owner[(placement.hall_id, placement.slot)]
+        for coach_id in group.coach_ids:
+            del self.coach_owner[(coach_id, placement.slot)]
+        self.group_slots[group.group_id].discard(placement.slot)
+        self.slot_load[placement.slot] -= 1
+
+    def move(self, index: int, hall_id: int, slot: int) -> None:
+        placement = self.placements[index]
+        group = self.groups[placement.group_id]
+        self._release(index)
+        placement.hall_id, placement.slot = hall_id, slot
+        self._occupy(group, hall_id, slot, index)
+
+    # --- Выбор слота ---
+
+    def best_candidate(self, group: GroupDemand, ignore: int = None, exclude_slot: int = None) -> Optional[Tuple[int, int]]:
+        """
+        Свободная пара (зал, слот) с наименьшим штрафом: занятие в уже занятый
+        группой день, зал не из предпочтений, загруженность слота.
+        """
+        used_days = {self.days[used] for used in self.group_slots[group.group_id]}
+        best, best_penalty = None, None
+        for slot in range(len(self.slots)):
+            if slot == exclude_slot:
+                continue
+            for hall_id in self.eligible_halls[group.group_id]:
+                if not self.is_free(group, hall_id, slot, ignore):
+                    continue
+                penalty = (
+                    self.days[slot] in used_days,
+                    hall_id != group.preferred_hall_id,
+                    self.slot_load[slot],
+                    slot,
+                )
+                if best_penalty is None or penalty < best_penalty:
+                    best, best_penalty = (hall_id, slot), penalty
+                # Для слота достаточно первого свободного зала: залы уже упорядочены по предпочтению
+                break
+        return best
+
+    def blockers(self, group: GroupDemand, hall_id: int, slot: int) -> Set[int]:
+        """
+        Размещения других групп, мешающие занять (hall_id, slot).
+        EXISTING в результате означает, что слот занят тренировкой из базы.
+        """
+        owners = {self.hall_owner.get((hall_id, slot))}
+        owners.update(self.coach_owner.get((coach_id, slot)) for coach_id in group.coach_ids)
+        owners.discard(None)
+        return owners
+
+    def repair(self, group: GroupDemand, deadline: float) -> bool:
+        """
+        Откат на один шаг: ищет слот, которому мешает ровно одно размещение другой группы,
+        переносит это размещение в другой свободный слот и занимает освободившееся место.
+        Число попыток переноса ограничено MAX_REPAIR_ATTEMPTS.
+        """
+        attempts = 0
+        failed: Set[Tuple[int, int]] = set()
+        for slot in range(len(self.slots)):
+            if slot in self.group_slots[group.group_id]:
+                continue
+            for hall_id in self.eligible_halls[group.group_id]:
+                owners = self.blockers(group, hall_id, slot)
+                if len(owners) != 1 or EXISTING in owners:
+                    continue
+                blocker_index = owners.pop()
+                if (blocker_index, slot) in failed:
+                    continue
+                if attempts == MAX_REPAIR_ATTEMPTS or time.perf_counter() > deadline:
+                    return False
+                attempts += 1
+
+                blocker_group = self.groups[self.placements[blocker_index].group_id]
+                target = self.best_candidate(blocker_group, ignore=blocker_index, exclude_slot=slot)
+                if target is None:
+                    failed.add((blocker_index, slot))
+                    continue
+                # Единственный владелец перенесен в другой слот — (hall_id, slot) теперь свободен
+                self.move(blocker_index, *target)
+                self.place(group, hall_id, slot)
+                return True
+        return False
+
+    def build(self, time_budget: float) -> TimetableResult:
+        deadline = time.perf_counter() + time_budget
+        result = TimetableResult(slots=self.slots)
+
+        # Сначала самые ограниченные группы
+        coach_load: Dict[int, int] = {}
+        for group in self.groups.values():
+            for coach_id in group.coach_ids:
+                coach_load[coach_id] = coach_load.get(coach_id, 0) + group.sessions
+        order = sorted(
+            self.groups.values(),
+            key=lambda group: (
+                len(self.eligible_halls[group.group_id]),
+                -max((coach_load[coach_id] for coach_id in group.coach_ids), default=0),
+                -group.sessions,
+                group.group_id,
+            ),
+        )
+
+        for group in order:
+            for _ in range(group.sessions):
+                if time.perf_counter() > deadline:
+                    result.timed_out = True
+                    result.unplaced[group.group_id] = result.unplaced.get(group.group_id, 0) + 1
+                    continue
+                candidate = self.best_candidate(group)
+                if candidate is not None:
+                    self.place(group, *candidate)
+                elif not self.repair(group, deadline):
+                    result.unplaced[group.group_id] = result.unplaced.get(group.group_id, 0) + 1
+
+        result.placements = self.placements
+        return result
+
+
+def build_timetable(
+    slots: List[Tuple[dt, dt]],
+    groups: List[GroupDemand],
+    hall_capacity: Dict[int, int],
+    busy_halls: Set[Tuple[int, int]] = frozenset(),
+    busy_coaches: Set[Tuple[int, int]] = frozenset(),
+    time_budget: float = 5.0,
+) -> TimetableResult:
+    """
+    Строит расписание недели. busy_halls и busy_coaches — уже занятые
+    пары (зал, слот) и (тренер, слот) из существующих тренировок.
+    """
+    builder = TimetableBuilder(slots, groups, hall_capacity, busy_halls, busy_coaches)
+    return builder.build(time_budget)
+
+
+def busy_slot_pairs(
+    slots: List[Tuple[dt, dt]], intervals: List[Tuple[int, dt, dt]]
+) -> Set[Tuple[int, int]]:
+    """
+    Переводит занятые интервалы ресурсов (resource_id, начало, конец) в пары (resource_id, слот),
+    которые они пересекают.
+    """
+    pairs = set()
+    for resource_id, start, end in intervals:
+        for slot, (slot_start, slot_end) in enumerate(slots):
+            if start < slot_end and end > slot_start:
+                pairs.add((resource_id, slot))
+    return pairs
@@ -1,13 +1,26 @@
 from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.dialects.postgresql import TSTZRANGE, ExcludeConstraint, Range
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 
 class TrainingHall(Base):
     __tablename__ = "training_halls"
+    __table_args__ = (
+        # Зал не может быть занят двумя тренировками одновременно.
+        # Проверка выполняется самой БД внутри INSERT (нужно расширение btree_gist).
+        ExcludeConstraint(
+            ("hall_id", "="),
+            ("during", "&&"),
+            name="training_halls_no_overlap",
+            using="gist",
+        ),
+    )
 
     training_id: Mapped[int] = mapped_column(ForeignKey("trainings.id"), primary_key=True)
     hall_id: Mapped[int] = mapped_column(ForeignKey("halls.id"), primary_key=True)
+    # Интервал занятости зала — копия [start_time, end_time) тренировки
+    during: Mapped[Range] = mapped_column(TSTZRANGE, nullable=False)
 
     training: Mapped["Training"] = relationship("Training", back_populates="training_halls")
     hall: Mapped["Hall"] = relationship("Hall", back_populates="training_halls")
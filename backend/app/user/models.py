@@ -1,12 +1,16 @@
 from sqlalchemy import Column, Integer, String, Boolean
 from sqlalchemy.orm import Mapped, mapped_column
-from app.database import Base, async_session_maker
-from sqlalchemy import Identity, select
+from app.database import Base, session_scope
+from sqlalchemy import Identity, Index, select, update, false
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, List
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Поиск пользователя по токену подписки на календарь
+        Index("ix_users_calendar_token_hash", "calendar_token_hash", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
     password_hash: Mapped[str] = mapped_column(String, nullable=False)
@@ -14,34 +18,93 @@ class User(Base):
     phone_number: Mapped[str] = mapped_column(String(20), nullable=False)
     email: Mapped[str] = mapped_column(String(320), unique=True, nullable=False)
 
+    # Дискриминатор наследования: "user", "coach" или "athlete" (см. Coach, Athlete)
+    role: Mapped[str] = mapped_column(String(20), nullable=False, default="user", server_default="user")
+    admin: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    # SHA-256 токена подписки на календарь (сам токен не хранится); NULL — подписка отключена
+    calendar_token_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    __mapper_args__ = {
+        "polymorphic_on": role,
+        "polymorphic_identity": "user",
+    }
+
     def __str__(self):
         return f"User(id={self.id})"
 
+    @staticmethod
+    def roles_of(role: str, admin: bool) -> List[str]:
+        """
+        Собирает список ролей по дискриминатору и флагу администратора.
+        """
+        roles = ["admin"] if admin else []
+        if role in ("coach", "athlete"):
+            roles.append(role)
+        return roles
+
     @staticmethod
     async def is_admin(user_id: int) -> bool:
-        async with async_session_maker() as session:
-            user = await session.get(User, user_id)
-            if user:
-                # Здесь должна быть логика проверки, является ли пользователь админом
-                # Например, проверка наличия роли "admin" у пользователя
-                return True  # Заглушка
-            return False
+        return "admin" in await User.get_roles(user_id)
 
     @staticmethod
     async def is_coach(user_id: int) -> bool:
-        async with async_session_maker() as session:
-            user = await session.get(User, user_id)
-            if user:
-                # Здесь должна быть логика проверки, является ли пользователь тренером
-                return False  # Заглушка
-            return False
+        return "coach" in await User.get_roles(user_id)
 
     @staticmethod
     async def is_athlete(user_id: int) -> bool:
-        async with async_session_maker() as session:
-            user = await session.get(User, user_id)
-            if user:
-                # Здесь должна быть логика проверки, является ли пользователь атлетом
-                return True  # Заглушка
-        return False
+        return "athlete" in await User.get_roles(user_id)
+
+    @staticmethod
+    async def get_roles(user_id: int) -> List[str]:
+        """
+        Возвращает список ролей пользователя ("admin", "coach", "athlete")
+        одним запросом по первичному ключу users.
+        """
+        async with session_scope() as session:
+            row = (await session.execute(
+                select(User.role, User.admin).where(User.id == user_id)
+            )).one_or_none()
+            if row is None:
+                return []
+            return User.roles_of(row.role, row.admin)
+
+    @staticmethod
+    def get_token_claims(user: "User") -> dict:
+        """
+        Формирует claims для access-токена: имя и роли пользователя.
+        Роли берутся из уже загруженной строки, без дополнительных запросов.
+        """
+        return {"name": user.full_name, "roles": User.roles_of(user.role, user.admin)}
+
+    @staticmethod
+    async def issue_calendar_token(user_id: int) -> str:
+        """
+        Выдает новый токен подписки на календарь. Предыдущий токен перестает действовать.
+        """
+        from app.utils import generate_refresh_token, hash_calendar_token
+
+        token = generate_refresh_token()
+        async with session_scope() as session:
+            await session.execute(
+                update(User).where(User.id == user_id).values(calendar_token_hash=hash_calendar_token(token))
+            )
+            await session.commit()
+        return token
+
+    @staticmethod
+    async def revoke_calendar_token(user_id: int) -> None:
+        async with session_scope() as session:
+            await session.execute(update(User).where(User.id == user_id).values(calendar_token_hash=None))
+            await session.commit()
+
+    @staticmethod
+    async def get_by_calendar_token(token: str):
+        """
+        Возвращает (id, role, admin) владельца токена календаря или None.
+        """
+        from app.utils import hash_calendar_token
 
+        async with session_scope() as session:
+            return (await session.execute(
+                select(User.id, User.role, User.admin).where(User.calendar_token_hash == hash_calendar_token(token))
+            )).one_or_none()
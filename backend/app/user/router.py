@@ -1,12 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+from app.database import session_scope, release_request_session
 from app.user.schemas import UserSchema, SignUpRequest, SignInRequest
 from app.user.models import User
-from app.utils import verify_password, create_access_token, decode_access_token, get_password_hash, generate_refresh_token
+from app.utils import verify_password_async, create_access_token, decode_access_token, get_password_hash_async, generate_refresh_token
 from sqlalchemy import select, update
 from fastapi.security import OAuth2PasswordBearer
-from app.middleware import get_current_user
+from app.middleware import get_current_user, invalidate_principal
 from pydantic import BaseModel
 
 
@@ -26,20 +26,24 @@ async def signin(request: SignInRequest):
         request (SignInRequest): Данные для входа пользователя (email и пароль).
     """
 
-    async with async_session_maker() as session:
+    async with session_scope() as session:
         user = await session.execute(select(User).where(User.email == request.email))
         user = user.scalar_one_or_none()
 
-        if not user or not verify_password(request.password, user.password_hash):
-            raise HTTPException(status_code=401, detail="Неверные учетные данные")
+    # Проверка пароля (argon2) идет без соединения с БД: очередь хэширования
+    # длиннее пула соединений, и ожидающие логины не должны занимать пул
+    await release_request_session()
+    if not user or not await verify_password_async(request.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Неверные учетные данные")
 
-        access_token = create_access_token(subject=user.id)
-        refresh_token = generate_refresh_token()
+    access_token = create_access_token(subject=user.id, claims=User.get_token_claims(user))
+    refresh_token = generate_refresh_token()
 
-        user.refresh_token = refresh_token
+    async with session_scope() as session:
+        await session.execute(update(User).where(User.id == user.id).values(refresh_token=refresh_token))
         await session.commit()
 
-        return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @user_router.post("/refresh", response_model=dict)
@@ -51,14 +55,14 @@ async def refresh_token(request: RefreshTokenRequest):
         request (RefreshTokenRequest): Запрос, содержащий токен обновления.
     """
     refresh_token = request.refresh_token
-    async with async_session_maker() as session:
+    async with session_scope() as session:
         user = await session.execute(select(User).where(User.refresh_token == refresh_token))
         user = user.scalar_one_or_none()
 
         if not user:
             raise HTTPException(status_code=400, detail="Invalid refresh token")
 
-        access_token = create_access_token(subject=user.id)
+        access_token = create_access_token(subject=user.id, claims=User.get_token_claims(user))
         new_refresh_token = generate_refresh_token()
 
         user.refresh_token = new_refresh_token
@@ -76,8 +80,10 @@ async def signup(request: SignUpRequest):
         request (SignUpRequest): Данные для регистрации пользователя.
     """
 
-    hashed_password = get_password_hash(request.password)
-    async with async_session_maker() as session:
+    # Хэширование (argon2) — до открытия сессии, без соединения из пула
+    await release_request_session()
+    hashed_password = await get_password_hash_async(request.password)
+    async with session_scope() as session:
         user = User(
             email=request.email,
             full_name=request.full_name,
@@ -108,13 +114,14 @@ async def logout(current_user: UserSchema = Depends(get_current_user)):
     Args:
         current_user (UserSchema, optional): Текущий аутентифицированный пользователь. Зависимость от `get_current_user`.
     """
-    async with async_session_maker() as session:
+    async with session_scope() as session:
         user = await session.get(User, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         user.refresh_token = None
         await session.commit()
+        invalidate_principal(current_user.id)
 
         return {"message": "Выход прошел успешно"}
 
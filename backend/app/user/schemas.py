@@ -4,6 +4,7 @@ class UserSchema(BaseModel):
     id: int
     name: str
     isAdmin: bool
+    isCoach: bool = False
     isAthlete: bool
 
     class Config:
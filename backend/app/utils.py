@@ -1,11 +1,25 @@
+import asyncio
+import hashlib
 import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import HTTPException
 from jose import JWTError, jwt
 import argon2
 
+from app.config import settings
+from app.metrics import password_hash_seconds
+
 ph = argon2.PasswordHasher()
 
+# argon2 отпускает GIL, поэтому хэширование в потоках не блокирует event loop
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="argon2"
+)
+password_hash_pending = 0
+
 SECRET_KEY = "YOUR_SECRET_KEY"  # Change this in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -22,14 +36,58 @@ def verify_password(password: str, hashed_password: str) -> bool:
         return False
 
 
+async def run_password_hasher(operation: str, func, *args):
+    """
+    Выполняет функцию хэширования в пуле из PASSWORD_HASH_WORKERS потоков.
+    Если очередь ожидающих запросов переполнена, сразу отвечает 503 с Retry-After,
+    чтобы всплеск входов не копил бесконечную очередь.
+    """
+    global password_hash_pending
+
+    if password_hash_pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер перегружен, повторите попытку позже",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+        )
+
+    password_hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_hash_executor, timed_password_hasher, operation, func, *args)
+    finally:
+        password_hash_pending -= 1
+
+
+def timed_password_hasher(operation: str, func, *args):
+    # Замеряется только работа argon2 в потоке, без ожидания в очереди пула
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        password_hash_seconds.observe(operation, value=time.perf_counter() - started)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_password_hasher("hash", get_password_hash, password)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await run_password_hasher("verify", verify_password, password, hashed_password)
+
+
 def create_access_token(
-    subject: str | dict, expires_delta: Optional[timedelta] = None
+    subject: str | dict, expires_delta: Optional[timedelta] = None, claims: Optional[dict] = None
 ) -> str:
+    """
+    Создает access-токен. В claims передаются данные пользователя (имя, роли),
+    чтобы при проверке токена не обращаться к базе данных.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -44,6 +102,10 @@ def decode_access_token(token: str) -> Optional[str]:
 def generate_refresh_token() -> str:
     return secrets.token_urlsafe(32)
 
+def hash_calendar_token(token: str) -> str:
+    # Токен календаря случайный (256 бит), поэтому достаточно быстрого хэша без соли
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def create_refresh_token(
     subject: str | dict, expires_delta: Optional[timedelta] = None
 ) -> str:
@@ -0,0 +1,52 @@
+"""
+Продакшен-запуск: gunicorn с воркерами uvicorn.
+
+    python -m app.migrate                 # один раз перед запуском
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Количество воркеров задается WEB_CONCURRENCY (по умолчанию — по числу ядер).
+"""
+import multiprocessing
+import os
+import time
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Приложение импортируется один раз в мастер-процессе, воркеры получают его через fork
+preload_app = True
+
+# По SIGTERM воркеры перестают принимать соединения и дорабатывают текущие запросы
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = 5
+
+accesslog = "-"
+# Без строки запроса (%(U)s вместо %(r)s): ссылки на календарь содержат токен в ?token=
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+server_started = time.perf_counter()
+
+
+def when_ready(server):
+    server.log.info("Мастер готов за %.2f с (импорт приложения и запуск)", time.perf_counter() - server_started)
+
+
+def post_fork(server, worker):
+    # Холодный старт воркера отсчитывается от fork, а не от импорта приложения в мастере
+    from app.metrics import mark_process_start
+    mark_process_start()
+    # Соединения, открытые в мастере, не должны использоваться в дочерних процессах
+    from app.database import engine
+    engine.sync_engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from app.metrics import process_rss_bytes
+    worker.log.info(
+        "Воркер %s инициализирован через %.2f с после старта мастера, память: %.1f МБ",
+        worker.pid, time.perf_counter() - server_started, process_rss_bytes() / 2**20,
+    )